@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+迁移性能基准测试
+在本地模拟服务 (fake_server.py) 和合成流程上测量 FlowMigrator 各环节的吞吐量、
+延迟分位数 (p50/p95/p99) 和峰值内存，结果可按 git 提交保存为基线，用于比较回归。
+
+用法:
+    python bench_migrate.py                      # 运行全部用例
+    python bench_migrate.py --case pack --size large
+    python bench_migrate.py --save               # 保存为当前提交的基线
+    python bench_migrate.py --compare            # 与最近一次其他提交的基线比较
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import argparse
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from fake_server import FakeYingdaoServer
+from gen_shadowbot import generate_robot, generate_tree
+from flow_events import events, console_sink
+from migrate_flow import FlowMigrator, LocalFlowScanner, format_bytes
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# 合成流程规模 (gen_shadowbot): 资源文件数, 资源文件平均大小（字节）
+ROBOT_SIZES = {
+    'small': (5, 4 * 1024),
+    'medium': (30, 32 * 1024),
+    'large': (100, 100 * 1024)
+}
+
+# 与基线比较时视为回归的变化比例
+REGRESSION_THRESHOLD = 0.10
+
+
+# ===== 统计 =====
+
+def percentile(sorted_values, p):
+    """线性插值分位数"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def peak_rss():
+    """进程峰值常驻内存（字节），不支持时返回 None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def measure(func, iterations, warmup=1):
+    """重复执行 func() 并统计
+
+    Args:
+        func: 返回本次处理字节数（或 None）的函数
+        iterations: 计入统计的次数
+        warmup: 预热次数（不计入统计）
+
+    Returns:
+        dict: 吞吐量、延迟分位数和内存
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    total_bytes = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        nbytes = func()
+        latencies.append(time.perf_counter() - t0)
+        total_bytes += nbytes or 0
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc 会明显拖慢分配，单独再执行一次统计 Python 内存峰值
+    # （模拟服务在同一进程中运行，其分配也会计入）
+    tracemalloc.start()
+    func()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 3) if elapsed else 0.0,
+        'mb_per_sec': round(total_bytes / elapsed / 1024 / 1024, 3) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'bytes': total_bytes,
+        'py_peak_bytes': traced_peak,
+        'rss_peak_bytes': peak_rss()
+    }
+
+
+# ===== 用例 =====
+
+class BenchContext:
+    """基准测试环境：模拟服务、已登录的迁移器和合成数据目录"""
+
+    def __init__(self, workdir, latency=0.0, bandwidth=None, catalog_size=300, scan_users=2, scan_apps=50, seed=0):
+        self.workdir = workdir
+        self.seed = seed
+        self.server = FakeYingdaoServer(latency=latency, bandwidth=bandwidth, seed=seed)
+        self.server.start()
+
+        self.source = FlowMigrator(base_url=self.server.url, auth_url=self.server.url)
+        self.target = FlowMigrator(base_url=self.server.url, auth_url=self.server.url)
+        self.catalog = FlowMigrator(base_url=self.server.url, auth_url=self.server.url)
+        self.source.login('bench-source', 'bench')
+        self.target.login('bench-target', 'bench')
+        self.catalog.login('bench-catalog', 'bench')
+
+        self.robots = {}
+        self.bots = {}
+        for size in ROBOT_SIZES:
+            robot_path = os.path.join(workdir, 'robots', size, 'xbot_robot')
+            resources, resource_size = ROBOT_SIZES[size]
+            package_data = generate_robot(robot_path, random.Random(f"{seed}:{size}"), f"基准流程-{size}",
+                                          resources=resources, resource_size=resource_size)
+            self.robots[size] = {
+                'app_id': package_data['uuid'],
+                'name': package_data['name'],
+                'robot_path': robot_path,
+                'package_data': package_data
+            }
+            self.bots[size] = self.source.create_package_bot(robot_path, package_data)
+            self.robots[size]['cloud'] = {
+                'appId': self.server.add_app('bench-source', package_data['name'], self.bots[size]),
+                'appName': package_data['name']
+            }
+
+        for i in range(catalog_size):
+            self.server.add_app('bench-catalog', f"目录流程{i}", self.bots['small'])
+
+        self.tree = os.path.join(workdir, 'users')
+        generate_tree(self.tree, scan_users, scan_apps, seed, resources=2, resource_size=4 * 1024)
+
+    def close(self):
+        self.server.stop()
+
+
+def bench_scan(ctx, size):
+    scanner = LocalFlowScanner(ctx.tree)
+
+    def run():
+        scanner.scan_all_flows()
+    return run
+
+
+def bench_pack(ctx, size):
+    robot = ctx.robots[size]
+    return lambda: len(ctx.source.create_package_bot(robot['robot_path'], robot['package_data']))
+
+
+def bench_repack(ctx, size):
+    bot_data = ctx.bots[size]
+    package_data = dict(ctx.robots[size]['package_data'], name='重新打包')
+    return lambda: len(ctx.source.repack_package_bot(bot_data, package_data))
+
+
+def bench_list(ctx, size):
+    def run():
+        ctx.catalog.get_cloud_flow_list()
+    return run
+
+
+def bench_migrate(ctx, size):
+    robot = ctx.robots[size]
+    nbytes = len(ctx.bots[size])
+
+    def run():
+        if not ctx.target.migrate(robot):
+            raise RuntimeError("migrate 失败")
+        return nbytes
+    return run
+
+
+def bench_migrate_cloud(ctx, size):
+    cloud_flow = ctx.robots[size]['cloud']
+    nbytes = len(ctx.bots[size])
+
+    def run():
+        if not ctx.target.migrate_from_cloud(cloud_flow, ctx.source):
+            raise RuntimeError("migrate_from_cloud 失败")
+        return nbytes * 2
+    return run
+
+
+# 用例名称 -> (构造函数, 是否区分流程规模, 默认次数)
+CASES = {
+    'scan': (bench_scan, False, 20),
+    'pack': (bench_pack, True, 30),
+    'repack': (bench_repack, True, 30),
+    'list': (bench_list, False, 20),
+    'migrate': (bench_migrate, True, 20),
+    'migrate_cloud': (bench_migrate_cloud, True, 20)
+}
+
+
+def run_benchmarks(case_names, sizes, iterations=None, latency=0.0, bandwidth=None, scan_apps=50, seed=0):
+    """运行基准测试
+
+    Returns:
+        dict: {'<用例>[<规模>]': 统计结果}
+    """
+    workdir = tempfile.mkdtemp(prefix='yd_bench_')
+    ctx = None
+    try:
+        ctx = BenchContext(workdir, latency=latency, bandwidth=bandwidth, scan_apps=scan_apps, seed=seed)
+        results = {}
+        for name in case_names:
+            factory, sized, default_iterations = CASES[name]
+            for size in (sizes if sized else [None]):
+                key = f"{name}[{size}]" if size else name
+                sys.stderr.write(f"  {key} ...\n")
+                results[key] = measure(factory(ctx, size), iterations or default_iterations)
+        return results
+    finally:
+        if ctx:
+            ctx.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ===== 基线 =====
+
+def git_commit():
+    """当前 git 提交（有未提交的改动时带 -dirty 后缀）"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, commit, path=BASELINE_FILE):
+    baselines = load_baselines(path)
+    baselines[commit] = {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2)
+
+
+def pick_baseline(baselines, commit, reference=None):
+    """选择比较对象：指定提交，或最近保存的其他提交"""
+    if reference:
+        return reference, baselines.get(reference)
+    others = [(entry['time'], key) for key, entry in baselines.items() if key != commit]
+    if not others:
+        return None, None
+    key = max(others)[1]
+    return key, baselines[key]
+
+
+def compare(results, baseline_results, threshold=REGRESSION_THRESHOLD):
+    """与基线比较 p50 延迟和吞吐量
+
+    Returns:
+        list: [(用例, 指标, 基线值, 当前值, 变化比例, 是否回归)]
+    """
+    rows = []
+    for key, current in results.items():
+        old = baseline_results.get(key)
+        if not old:
+            continue
+        for metric, higher_is_better in (('p50_ms', False), ('p95_ms', False), ('ops_per_sec', True)):
+            before, after = old.get(metric), current.get(metric)
+            if not before:
+                continue
+            change = (after - before) / before
+            regressed = change < -threshold if higher_is_better else change > threshold
+            rows.append((key, metric, before, after, change, regressed))
+    return rows
+
+
+# ===== 输出 =====
+
+def print_results(results, stream=None):
+    stream = stream or sys.stdout
+    stream.write(f"\n{'用例':<22}{'次数':>6}{'ops/s':>10}{'MB/s':>9}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'py峰值':>11}{'RSS峰值':>11}\n")
+    stream.write("-" * 99 + "\n")
+    for key, r in results.items():
+        rss = format_bytes(r['rss_peak_bytes']) if r['rss_peak_bytes'] else '-'
+        stream.write(f"{key:<24}{r['iterations']:>6}{r['ops_per_sec']:>10.1f}{r['mb_per_sec']:>9.2f}"
+                     f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                     f"{format_bytes(r['py_peak_bytes']):>11}{rss:>11}\n")
+
+
+def print_comparison(rows, reference, stream=None):
+    stream = stream or sys.stdout
+    stream.write(f"\n与基线 {reference} 比较:\n")
+    for key, metric, before, after, change, regressed in rows:
+        mark = "  [回归]" if regressed else ""
+        stream.write(f"  {key:<22}{metric:<12}{before:>10.2f} -> {after:>10.2f} ({change:+.1%}){mark}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="影刀迁移性能基准测试")
+    parser.add_argument('--case', action='append', choices=list(CASES), help="只运行指定用例（可重复）")
+    parser.add_argument('--size', action='append', choices=list(ROBOT_SIZES), help="只运行指定规模（可重复）")
+    parser.add_argument('--iterations', type=int, help="每个用例的次数（默认按用例）")
+    parser.add_argument('--latency', type=float, default=0.0, help="模拟服务每个请求的延迟（秒）")
+    parser.add_argument('--bandwidth', type=int, help="模拟服务带宽上限（字节/秒）")
+    parser.add_argument('--scan-apps', type=int, default=50, help="scan 用例每个用户的流程数（共 2 个用户）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="把结果写入 JSON 文件")
+    parser.add_argument('--baseline-file', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help="保存为当前提交的基线")
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT',
+                        help="与基线比较（默认最近一次其他提交）")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="回归判定比例 (默认 0.10)")
+    args = parser.parse_args()
+
+    # 迁移过程的日志会干扰计时和输出，只保留结果
+    events.remove_sink(console_sink)
+
+    commit = git_commit()
+    print(f"[基准测试] 提交 {commit}, Python {platform.python_version()}, {platform.platform()}")
+    results = run_benchmarks(args.case or list(CASES), args.size or list(ROBOT_SIZES),
+                             args.iterations, args.latency, args.bandwidth, args.scan_apps, args.seed)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'commit': commit, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    code = 0
+    if args.compare is not None:
+        reference, baseline = pick_baseline(load_baselines(args.baseline_file), commit, args.compare or None)
+        if baseline is None:
+            print("\n[警告] 没有可比较的基线")
+        else:
+            rows = compare(results, baseline['results'], args.threshold)
+            print_comparison(rows, reference)
+            if any(row[-1] for row in rows):
+                code = 1
+
+    if args.save:
+        save_baseline(results, commit, args.baseline_file)
+        print(f"\n[已保存] 基线 {commit} -> {args.baseline_file}")
+
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,763 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+影刀接口本地模拟服务
+根据 请求/ 目录中的 Fiddler 抓包还原 api.yingdao.com / api.winrobot360.com / OSS 的协议：
+登录、分配上传地址（预签名 URL）、OSS PUT/GET、创建应用、分页列表、应用详情、移入回收站。
+可配置延迟和带宽，用于离线测试和压测 FlowMigrator。
+
+用法:
+    python fake_server.py --port 8765 --latency 0.05 --bandwidth 2MB
+    然后设置环境变量 YINGDAO_BASE_URL / YINGDAO_AUTH_URL 为 http://127.0.0.1:8765 运行迁移工具
+"""
+import os
+import re
+import io
+import hmac
+import json
+import time
+import uuid
+import zlib
+import base64
+import random
+import hashlib
+import socket
+import zipfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '请求')
+
+# 抓包中各接口的路径 -> 模板名称
+CAPTURE_ENDPOINTS = {
+    '/oauth/token': 'login',
+    '/api/client/app/file/assignUploadUrl': 'assign_upload_url',
+    '/api/client/app/develop/create': 'create',
+    '/api/client/app/develop/list': 'list',
+    '/api/client/app/develop/app/detail': 'detail',
+    '/api/client/recycle/recycle': 'recycle'
+}
+
+# 可注入的故障类型
+#   slow: 额外延迟 slow_delay 秒    error: 500/502/503/504    throttle: 429 (Retry-After: 1)
+#   drop: 读完请求后直接断开连接    expire: 分配上传地址/应用详情返回已过期的预签名 URL
+#   double_json: 登录响应为两个拼接的 JSON ("}{")
+FAULT_KINDS = ('slow', 'error', 'throttle', 'drop', 'expire', 'double_json')
+
+# 抓包缺失时使用的最小模板（字段与抓包一致）
+DEFAULT_TEMPLATES = {
+    'login': {"access_token": "", "apiType": "oauth2", "code": "200", "expires_in": 2592000,
+              "isFirstClientLogin": False, "scope": "all", "success": True, "token_type": "bearer"},
+    'list_item': {"appId": "", "versionId": "", "appName": "", "updateTime": "", "icon": "",
+                  "versionStatus": "d", "authority": "owner", "internalDependencyPackage": "",
+                  "uiaType": "pc", "developerCount": 1, "developTimestamp": 0, "description": "",
+                  "developTime": "", "enableViewSource": 0, "developPackageCode": "",
+                  "developVersion": "1", "currentVersion": "1", "appStatus": "r", "lock": False},
+    'page': {"total": 0, "size": 30, "page": 1, "pages": 1, "offset": 0, "order": "desc"},
+    'detail': {"appId": "", "createTime": "", "updateTime": "", "appType": "app", "versionId": "",
+               "versionStatus": "d", "version": "1", "versionName": "", "packageMd5": "",
+               "schemaKey": "", "packageKey": "", "developTimestamp": 0, "packageBotUrl": "",
+               "packageSchemaUrl": "", "appName": "", "icon": "", "authority": "owner",
+               "uiaType": "PC", "developVersion": "1", "currentVersion": "1", "groupId": ""}
+}
+
+
+# ===== 抓包解析 =====
+
+def _dechunk(body):
+    """解码 HTTP chunked 编码，返回 (内容, 剩余数据)"""
+    out = bytearray()
+    pos = 0
+    while True:
+        end = body.find(b'\r\n', pos)
+        if end < 0:
+            return bytes(out), b''
+        try:
+            size = int(body[pos:end].split(b';')[0], 16)
+        except ValueError:
+            return bytes(out), body[pos:]
+        if size == 0:
+            return bytes(out), body[end + 4:]
+        out += body[end + 2:end + 2 + size]
+        pos = end + 2 + size + 2
+
+
+def _parse_headers(block):
+    lines = block.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def _read_body(data, headers):
+    """按 Content-Length / chunked 读取消息体，返回 (解码后的内容, 剩余数据)"""
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        body, rest = _dechunk(data)
+    else:
+        length = int(headers.get('content-length', 0) or 0)
+        body, rest = data[:length], data[length:]
+    if 'gzip' in headers.get('content-encoding', ''):
+        try:
+            body = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body)
+        except zlib.error:
+            pass
+    return body, rest
+
+
+def parse_capture(path):
+    """解析 Fiddler 导出的会话文本
+
+    Returns:
+        list: [{'method', 'url', 'request_headers', 'request_body',
+                'status', 'response_headers', 'response_body'}, ...]
+              CONNECT 隧道等无法解析的片段会被跳过
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    exchanges = []
+    for match in re.finditer(rb'(?:^|\n)(GET|POST|PUT|DELETE) (https?://\S+) HTTP/1\.1\r\n', raw):
+        start = match.start(1)
+        header_end = raw.find(b'\r\n\r\n', start)
+        if header_end < 0:
+            continue
+        _, request_headers = _parse_headers(raw[start:header_end])
+        request_body, rest = _read_body(raw[header_end + 4:], request_headers)
+
+        response_start = rest.find(b'HTTP/1.1 ')
+        if response_start < 0:
+            continue
+        rest = rest[response_start:]
+        response_header_end = rest.find(b'\r\n\r\n')
+        status_line, response_headers = _parse_headers(rest[:response_header_end])
+        response_body, _ = _read_body(rest[response_header_end + 4:], response_headers)
+
+        exchanges.append({
+            'method': match.group(1).decode(),
+            'url': match.group(2).decode('latin-1'),
+            'request_headers': request_headers,
+            'request_body': request_body,
+            'status': int(status_line.split()[1]),
+            'response_headers': response_headers,
+            'response_body': response_body
+        })
+    return exchanges
+
+
+def load_captures(capture_dir=CAPTURE_DIR):
+    """读取抓包目录，按接口返回第一次出现的会话
+
+    Returns:
+        dict: {'login': exchange, 'list': exchange, ..., 'oss_get': exchange, 'oss_put': exchange}
+    """
+    captures = {}
+    if not os.path.isdir(capture_dir):
+        return captures
+
+    for name in sorted(os.listdir(capture_dir)):
+        if not name.endswith('.txt'):
+            continue
+        for exchange in parse_capture(os.path.join(capture_dir, name)):
+            parts = urlsplit(exchange['url'])
+            if 'aliyuncs.com' in parts.netloc:
+                key = 'oss_get' if exchange['method'] == 'GET' else 'oss_put'
+            else:
+                key = CAPTURE_ENDPOINTS.get(parts.path)
+            if key and key not in captures:
+                captures[key] = exchange
+    return captures
+
+
+def _capture_json(captures, key):
+    exchange = captures.get(key)
+    if not exchange:
+        return None
+    try:
+        return json.loads(exchange['response_body'].decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def build_templates(captures):
+    """从抓包中提取响应模板（字段集合与默认值），缺失的部分使用内置模板"""
+    templates = json.loads(json.dumps(DEFAULT_TEMPLATES))
+
+    login = _capture_json(captures, 'login')
+    if login:
+        templates['login'] = login
+
+    listing = _capture_json(captures, 'list')
+    if listing and listing.get('data'):
+        templates['list_item'] = dict(listing['data'][0])
+        templates['page'] = dict(listing.get('page') or templates['page'])
+
+    detail = _capture_json(captures, 'detail')
+    if detail and detail.get('data'):
+        templates['detail'] = dict(detail['data'])
+
+    return templates
+
+
+def sample_bot(captures=None):
+    """抓包中下载到的真实 package.bot（没有时生成一个最小的流程包）"""
+    exchange = (captures or {}).get('oss_get')
+    if exchange and exchange['response_body'][:2] == b'PK':
+        return exchange['response_body']
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        package_data = {"uuid": str(uuid.uuid4()), "name": "sample", "robot_type": "app",
+                        "flows": [{"name": "main", "filename": "main", "kind": "Visual"}]}
+        zf.writestr('package.json', json.dumps(package_data, ensure_ascii=False, indent=4))
+        zf.writestr('main.py', "# sample\n")
+        zf.writestr('.dev/main.flow.json', "{}")
+    return buffer.getvalue()
+
+
+def parse_size(text):
+    """解析带单位的大小，如 512KB、2MB"""
+    if text is None:
+        return None
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMG]?)B?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无法识别的大小: {text}")
+    return int(float(match.group(1)) * 1024 ** 'BKMG'.index(match.group(2).upper() or 'B'))
+
+
+# ===== 模拟服务 =====
+
+class FakeYingdaoServer:
+    """模拟服务
+
+    任意账号密码都能登录，每个账号有独立的应用空间；OSS 对象存放在内存中。
+
+    Args:
+        latency: 每个请求的固定延迟（秒）
+        jitter: 延迟的随机抖动上限（秒）
+        bandwidth: 请求/响应体的传输速率上限（字节/秒），None 表示不限速
+        upload_ttl: 上传预签名 URL 的有效期（秒）
+        read_ttl: 下载预签名 URL 的有效期（秒）
+        capture_dir: 抓包目录
+
+    故障注入: set_faults(error=0.05, drop=0.01, ...) 设置每个请求触发各类故障的概率（见 FAULT_KINDS），
+    stats['faults'] 记录触发次数，stats['wasted_bytes'] 记录失败请求收发的字节数。
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, bandwidth=None,
+                 upload_ttl=3600, read_ttl=43200, capture_dir=CAPTURE_DIR, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.upload_ttl = upload_ttl
+        self.read_ttl = read_ttl
+        self.captures = load_captures(capture_dir)
+        self.templates = build_templates(self.captures)
+        self.random = random.Random(seed)
+
+        self.secret = os.urandom(16)
+        self.access_key_id = "LTAIfakeAccessKey0000"
+        self.tokens = {}   # access_token -> 账号
+        self.apps = {}     # 账号 -> {appId: app}
+        self.objects = {}  # OSS key -> bytes
+        self.stats = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'wasted_bytes': 0,
+                      'faults': dict.fromkeys(FAULT_KINDS, 0)}
+        self.faults = dict.fromkeys(FAULT_KINDS, 0.0)
+        self.slow_delay = 1.0
+        self.lock = threading.RLock()
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程启动服务，返回服务地址"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-yingdao', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def configure(self, migrator):
+        """让 FlowMigrator 指向本服务"""
+        migrator.base_url = self.url
+        migrator.auth_url = self.url
+        return migrator
+
+    # ----- 预签名 URL -----
+
+    def _signature(self, method, key, expires):
+        digest = hmac.new(self.secret, f"{method}\n{key}\n{expires}".encode('utf-8'), hashlib.sha1).digest()
+        return base64.b64encode(digest).decode('ascii')
+
+    def presign(self, method, key, ttl):
+        """生成与阿里云 OSS 格式一致的预签名 URL"""
+        expires = int(time.time() + ttl)
+        signature = quote(self._signature(method, key, expires), safe='')
+        return f"{self.url}/oss/{key}?Expires={expires}&OSSAccessKeyId={self.access_key_id}&Signature={signature}"
+
+    def verify_presigned(self, method, key, query):
+        """校验预签名参数，返回 None 或 (状态码, 错误码, 错误信息)"""
+        try:
+            expires = int(query['Expires'][0])
+            signature = unquote(query['Signature'][0])
+        except (KeyError, ValueError, IndexError):
+            return 403, 'AccessDenied', 'Missing signature parameters.'
+        if not hmac.compare_digest(signature, self._signature(method, key, expires)):
+            return 403, 'SignatureDoesNotMatch', 'The request signature we calculated does not match.'
+        if expires < time.time():
+            return 403, 'AccessDenied', 'Request has expired.'
+        return None
+
+    # ----- 数据 -----
+
+    def login(self, username):
+        token = str(uuid.uuid4())
+        with self.lock:
+            self.tokens[token] = username
+            self.apps.setdefault(username, {})
+        return token
+
+    def add_app(self, account, name, bot_data=None, package_data=None, app_id=None, update_time=None):
+        """直接向账号添加一个云端应用（用于准备测试数据）
+
+        Returns:
+            str: appId
+        """
+        app_id = app_id or str(uuid.uuid4())
+        bot_data = bot_data if bot_data is not None else sample_bot(self.captures)
+        if package_data is None:
+            try:
+                with zipfile.ZipFile(io.BytesIO(bot_data)) as zf:
+                    package_data = json.loads(zf.read('package.json').decode('utf-8'))
+            except (KeyError, ValueError, zipfile.BadZipFile):
+                package_data = {}
+        package_data = dict(package_data, uuid=app_id, name=name)
+
+        prefix = f"robots/robot-{app_id}/v-1"
+        with self.lock:
+            self.objects[f"{prefix}/package.bot"] = bot_data
+            self.objects[f"{prefix}/package.json"] = json.dumps(package_data, ensure_ascii=False, indent=4).encode('utf-8')
+            self._register_app(account, app_id, name, update_time)
+        return app_id
+
+    def _register_app(self, account, app_id, name, update_time=None, group_id=""):
+        now = update_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = int(datetime.strptime(now, '%Y-%m-%d %H:%M:%S').timestamp() * 1000)
+        prefix = f"robots/robot-{app_id}/v-1"
+        app = {
+            'appId': app_id,
+            'versionId': str(uuid.uuid4()),
+            'appName': name,
+            'updateTime': now,
+            'developTime': now,
+            'developTimestamp': timestamp,
+            'groupId': group_id or "",
+            'packageKey': f"{prefix}/package.bot",
+            'schemaKey': f"{prefix}/package.json",
+            'packageMd5': hashlib.md5(f"{prefix}/package.json".encode('utf-8')).hexdigest()
+        }
+        self.apps.setdefault(account, {})[app_id] = app
+        return app
+
+    def list_item(self, app):
+        item = dict(self.templates['list_item'])
+        for key in item:
+            if key in app:
+                item[key] = app[key]
+        item['appId'] = app['appId']
+        item['appName'] = app['appName']
+        return item
+
+    def detail(self, app, ttl=None):
+        ttl = self.read_ttl if ttl is None else ttl
+        data = dict(self.templates['detail'])
+        data.update({
+            'appId': app['appId'],
+            'appName': app['appName'],
+            'versionName': app['appName'],
+            'versionId': app['versionId'],
+            'updateTime': app['updateTime'],
+            'createTime': app['developTime'],
+            'developTime': app['developTime'],
+            'developTimestamp': app['developTimestamp'],
+            'packageMd5': app['packageMd5'],
+            'packageKey': app['packageKey'],
+            'schemaKey': app['schemaKey'],
+            'groupId': app['groupId'],
+            'packageBotUrl': self.presign('GET', app['packageKey'], ttl),
+            'packageSchemaUrl': self.presign('GET', app['schemaKey'], ttl)
+        })
+        return data
+
+    def orphan_bytes(self):
+        """已上传但没有对应应用的对象大小（失败迁移留下的数据）"""
+        with self.lock:
+            live = {key for apps in self.apps.values() for app in apps.values()
+                    for key in (app['packageKey'], app['schemaKey'])}
+            return sum(len(data) for key, data in self.objects.items() if key not in live)
+
+    # ----- 故障注入 -----
+
+    def set_faults(self, slow_delay=None, **rates):
+        """设置故障概率，如 set_faults(error=0.05, throttle=0.02)；未指定的类型保持不变"""
+        for kind, rate in rates.items():
+            if kind not in FAULT_KINDS:
+                raise ValueError(f"未知的故障类型: {kind}")
+            self.faults[kind] = rate
+        if slow_delay is not None:
+            self.slow_delay = slow_delay
+
+    def clear_faults(self):
+        self.faults = dict.fromkeys(FAULT_KINDS, 0.0)
+
+    def inject(self, kind):
+        """按概率决定本次请求是否触发该故障"""
+        rate = self.faults[kind]
+        if not rate:
+            return False
+        with self.lock:
+            hit = self.random.random() < rate
+            if hit:
+                self.stats['faults'][kind] += 1
+        return hit
+
+    # ----- 网络模拟 -----
+
+    def delay(self):
+        wait = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttle(self, nbytes):
+        if self.bandwidth and nbytes:
+            time.sleep(nbytes / self.bandwidth)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'YdServer_v1.2.0'
+
+    # 不输出访问日志
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    # ----- 基础读写 -----
+
+    def _read_body(self):
+        chunk_size = 64 * 1024
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+                self.fake.throttle(size)
+            body = bytes(body)
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            parts = []
+            while remaining > 0:
+                chunk = self.rfile.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                parts.append(chunk)
+                remaining -= len(chunk)
+                self.fake.throttle(len(chunk))
+            body = b''.join(parts)
+        with self.fake.lock:
+            self.fake.stats['bytes_in'] += len(body)
+        self._body_len = len(body)
+        return body
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        failed = status >= 400
+        if isinstance(body, dict):
+            failed = failed or body.get('success') is False
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        chunk_size = 64 * 1024
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset:offset + chunk_size]
+            self.wfile.write(chunk)
+            self.fake.throttle(len(chunk))
+        with self.fake.lock:
+            self.fake.stats['bytes_out'] += len(body)
+            if failed:
+                self.fake.stats['wasted_bytes'] += self._body_len + len(body)
+
+    def _drop(self):
+        """不返回响应直接断开连接"""
+        with self.fake.lock:
+            self.fake.stats['wasted_bytes'] += self._body_len
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _oss_error(self, status, code, message):
+        body = (f'<?xml version="1.0" encoding="UTF-8"?>\n<Error>\n  <Code>{code}</Code>\n'
+                f'  <Message>{message}</Message>\n  <RequestId>{uuid.uuid4().hex[:24].upper()}</RequestId>\n'
+                f'  <HostId>winrobot-pri-a.oss-cn-hangzhou.aliyuncs.com</HostId>\n</Error>\n')
+        self._send(status, body, content_type='application/xml')
+
+    def _account(self):
+        auth = self.headers.get('Authorization', '')
+        token = auth.split(' ', 1)[1] if ' ' in auth else ''
+        return self.fake.tokens.get(token)
+
+    def _json_body(self, body):
+        try:
+            return json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            return None
+
+    # ----- 分发 -----
+
+    def _dispatch(self, method):
+        fake = self.fake
+        with fake.lock:
+            fake.stats['requests'] += 1
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        self._body_len = 0
+        body = self._read_body() if method in ('POST', 'PUT') else b''
+        fake.delay()
+
+        if fake.inject('slow'):
+            time.sleep(fake.slow_delay)
+        if fake.inject('drop'):
+            return self._drop()
+        if fake.inject('throttle'):
+            return self._send(429, {"code": 429, "success": False, "msg": "Too Many Requests"},
+                              headers={'Retry-After': '1'})
+        if fake.inject('error'):
+            status = fake.random.choice((500, 502, 503, 504))
+            return self._send(status, {"code": status, "success": False, "msg": "Service Unavailable"})
+
+        if parts.path.startswith('/oss/'):
+            return self._handle_oss(method, unquote(parts.path[len('/oss/'):]), query, body)
+
+        if method == 'POST' and parts.path == '/oauth/token':
+            return self._handle_login(body)
+
+        route = CAPTURE_ENDPOINTS.get(parts.path)
+        if route is None or route == 'login':
+            return self._send(404, {"code": 404, "success": False, "msg": "not found"})
+
+        account = self._account()
+        if account is None:
+            return self._send(401, {"code": 401, "success": False, "msg": "invalid_token"})
+
+        handler = getattr(self, f'_handle_{route}')
+        return handler(account, query, body)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    # ----- 接口 -----
+
+    def _handle_login(self, body):
+        form = parse_qs(body.decode('utf-8'))
+        username = (form.get('username') or [''])[0]
+        if not username or not form.get('password'):
+            return self._send(200, {"code": "400", "success": False, "msg": "用户名或密码错误"},
+                              content_type='text/plain;charset=UTF-8')
+        result = dict(self.fake.templates['login'], access_token=self.fake.login(username))
+        body = json.dumps(result, ensure_ascii=False)
+        if self.fake.inject('double_json'):
+            # 客户端偶尔收到两个拼接的 JSON，FlowMigrator.login 需要只取第一个
+            body += json.dumps({"code": "200", "success": True})
+        self._send(200, body, content_type='text/plain;charset=UTF-8')
+
+    def _handle_assign_upload_url(self, account, query, body):
+        payload = self._json_body(body) or {}
+        app_id = payload.get('appId')
+        if not app_id:
+            return self._send(200, {"code": 400, "success": False, "msg": "appId is required"})
+        is_bot = str(payload.get('isBot')).lower() == 'true'
+        key = f"robots/robot-{app_id}/v-1/package.{'bot' if is_bot else 'json'}"
+        fake = self.fake
+        expired = fake.inject('expire')
+        upload_ttl = -60 if expired else fake.upload_ttl
+        read_ttl = -60 if expired else fake.read_ttl
+        self._send(200, {
+            "data": {
+                "fileKey": key,
+                "uploadUrl": fake.presign('PUT', key, upload_ttl),
+                "readUrl": fake.presign('GET', key, read_ttl),
+                "fileKeyMd5": hashlib.md5(key.encode('utf-8')).hexdigest(),
+                "headers": {}
+            },
+            "code": 200,
+            "success": True
+        })
+
+    def _handle_oss(self, method, key, query, body):
+        fake = self.fake
+        error = fake.verify_presigned(method, key, query)
+        if error:
+            return self._oss_error(*error)
+
+        etag = '"' + hashlib.md5(body).hexdigest().upper() + '"'
+        if method == 'PUT':
+            with fake.lock:
+                fake.objects[key] = body
+            return self._send(200, b'', content_type='application/octet-stream', headers={'ETag': etag})
+
+        with fake.lock:
+            data = fake.objects.get(key)
+        if data is None:
+            return self._oss_error(404, 'NoSuchKey', 'The specified key does not exist.')
+        md5 = hashlib.md5(data)
+        self._send(200, data, content_type='application/octet-stream', headers={
+            'ETag': '"' + md5.hexdigest().upper() + '"',
+            'Content-MD5': base64.b64encode(md5.digest()).decode('ascii'),
+            'Server': 'AliyunOSS'
+        })
+
+    def _handle_create(self, account, query, body):
+        payload = self._json_body(body) or {}
+        app_id = payload.get('appId')
+        name = (payload.get('appPackage') or {}).get('name')
+        prefix = f"robots/robot-{app_id}/v-1"
+        fake = self.fake
+
+        with fake.lock:
+            if not app_id or not name:
+                return self._send(200, {"code": 400, "success": False, "msg": "参数错误"})
+            if any(app_id in apps for apps in fake.apps.values()):
+                return self._send(200, {"code": 400, "success": False, "msg": "应用已存在"})
+            missing = [key for key in (f"{prefix}/package.bot", f"{prefix}/package.json") if key not in fake.objects]
+            if missing:
+                return self._send(200, {"code": 400, "success": False, "msg": f"文件未上传: {missing}"})
+            if payload.get('packageMd5') != hashlib.md5(f"{prefix}/package.json".encode('utf-8')).hexdigest():
+                return self._send(200, {"code": 400, "success": False, "msg": "packageMd5 校验失败"})
+            fake._register_app(account, app_id, name, group_id=payload.get('groupId') or "")
+
+        self._send(200, {"code": 200, "success": True})
+
+    def _handle_list(self, account, query, body):
+        payload = self._json_body(body) or {}
+        page_dto = payload.get('pageDTO') or {}
+        page = max(1, int(page_dto.get('page') or 1))
+        size = max(1, int(page_dto.get('size') or 30))
+        name = (payload.get('name') or '').lower()
+        group_id = payload.get('groupId')
+
+        with self.fake.lock:
+            apps = list(self.fake.apps.get(account, {}).values())
+        if name:
+            apps = [app for app in apps if name in app['appName'].lower()]
+        if group_id:
+            apps = [app for app in apps if app['groupId'] == group_id]
+        # sortBy "4": 按更新时间倒序
+        apps.sort(key=lambda app: (app['updateTime'], app['developTimestamp']), reverse=True)
+
+        total = len(apps)
+        pages = max(1, (total + size - 1) // size)
+        items = [self.fake.list_item(app) for app in apps[(page - 1) * size:page * size]]
+        page_info = dict(self.fake.templates['page'], total=total, size=size, page=page,
+                         pages=pages, offset=(page - 1) * size)
+        self._send(200, {"data": items, "page": page_info, "code": 200, "success": True})
+
+    def _handle_detail(self, account, query, body):
+        app_id = (query.get('appId') or [''])[0]
+        with self.fake.lock:
+            app = self.fake.apps.get(account, {}).get(app_id)
+        if app is None:
+            return self._send(200, {"code": 404, "success": False, "msg": "应用不存在"})
+        ttl = -60 if self.fake.inject('expire') else None
+        self._send(200, {"data": self.fake.detail(app, ttl), "code": 200, "success": True})
+
+    def _handle_recycle(self, account, query, body):
+        app_id = (self._json_body(body) or {}).get('appId')
+        with self.fake.lock:
+            removed = self.fake.apps.get(account, {}).pop(app_id, None)
+        if removed is None:
+            return self._send(200, {"code": 404, "success": False, "msg": "应用不存在"})
+        self._send(200, {"data": 1, "code": 200, "success": True})
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="影刀接口本地模拟服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="延迟随机抖动上限（秒）")
+    parser.add_argument('--bandwidth', help="传输速率上限，如 512KB、2MB（每秒）")
+    parser.add_argument('--upload-ttl', type=int, default=3600, help="上传 URL 有效期（秒）")
+    parser.add_argument('--seed-apps', type=int, default=0, help="为 --seed-account 预置的云端应用数")
+    parser.add_argument('--seed-account', default='source')
+    parser.add_argument('--fault', action='append', default=[], metavar='KIND=RATE',
+                        help=f"故障注入概率，可重复: {', '.join(FAULT_KINDS)}")
+    parser.add_argument('--slow-delay', type=float, default=1.0, help="slow 故障的额外延迟（秒）")
+    args = parser.parse_args()
+
+    server = FakeYingdaoServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                               bandwidth=parse_size(args.bandwidth), upload_ttl=args.upload_ttl)
+    try:
+        faults = {kind: float(rate) for kind, _, rate in (item.partition('=') for item in args.fault)}
+        server.set_faults(slow_delay=args.slow_delay, **faults)
+    except ValueError as e:
+        parser.error(str(e))
+    for i in range(args.seed_apps):
+        server.add_app(args.seed_account, f"示例流程{i + 1}")
+
+    print(f"[模拟服务] {server.url}  (抓包模板: {', '.join(sorted(server.captures)) or '无'})")
+    print(f"  export YINGDAO_BASE_URL={server.url} YINGDAO_AUTH_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
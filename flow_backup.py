@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+云端账号备份
+把账号中所有应用的 package.bot 并发下载到本地备份目录，并维护清单 manifest.json。
+增量备份：清单中 versionId 和 updateTime 都没有变化（且文件还在）的应用不再下载。
+使用去重存储 (flow_chunks.ChunkStore) 时，每个版本保存为一个快照并保留历史版本，
+各账号共用 <store>/chunks 中的块。
+
+目录结构:
+    <store>/<账号>/manifest.json
+    <store>/<账号>/apps/<appId>/package.bot      （不使用去重存储时）
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from flow_events import events
+
+MANIFEST_VERSION = 1
+
+# 清单中保存的列表字段
+MANIFEST_FIELDS = ('appName', 'versionId', 'updateTime', 'developTimestamp', 'onlineVersion', 'developVersion',
+                   'versionStatus')
+
+
+def _write_atomic(path, data):
+    """先写临时文件再替换，中断时不会留下半个文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def account_dir(store_dir, account):
+    """账号的备份目录（账号名中的路径分隔符替换为 _）"""
+    return os.path.join(store_dir, account.replace('/', '_').replace('\\', '_'))
+
+
+def load_backup_manifest(path):
+    """读取备份清单，不存在时返回空清单"""
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'apps': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"不支持的备份清单版本: {manifest.get('version')}")
+    return manifest
+
+
+def is_current(entry, app, exists):
+    """清单中的备份是否仍是该应用的最新版本
+
+    Args:
+        entry: 清单中的记录
+        app: 应用列表中的应用
+        exists: exists(entry) -> 备份数据是否还在
+    """
+    return (entry is not None and not entry.get('deleted')
+            and entry.get('versionId') == app.get('versionId')
+            and entry.get('updateTime') == app.get('updateTime')
+            and exists(entry))
+
+
+class AccountBackup:
+    """账号备份
+
+    Args:
+        migrator: 已登录的 FlowMigrator
+        store_dir: 备份根目录
+        jobs: 并发下载数
+        chunk_store: flow_chunks.ChunkStore，为空时直接保存 package.bot 文件
+    """
+
+    def __init__(self, migrator, store_dir, jobs=4, chunk_store=None):
+        self.migrator = migrator
+        self.jobs = jobs
+        self.chunk_store = chunk_store
+        self.root = account_dir(store_dir, migrator.account)
+        self.manifest_path = os.path.join(self.root, 'manifest.json')
+        self.manifest = load_backup_manifest(self.manifest_path)
+        self._lock = threading.Lock()
+
+    def bot_path(self, app_id):
+        return os.path.join(self.root, 'apps', app_id, 'package.bot')
+
+    def _exists(self, entry):
+        if entry.get('snapshot'):
+            return self.chunk_store is not None and self.chunk_store.has_snapshot(entry['snapshot'])
+        return bool(entry.get('file')) and os.path.exists(os.path.join(self.root, entry['file']))
+
+    def plan(self, apps):
+        """需要下载的应用（新增或 versionId/updateTime 变化的）"""
+        return [app for app in apps if not is_current(self.manifest['apps'].get(app['appId']), app, self._exists)]
+
+    def run(self, apps=None):
+        """执行一次增量备份
+
+        Args:
+            apps: 应用列表，为空时获取账号的全部应用
+
+        Returns:
+            list: 每个需要下载的应用的结果 {'id', 'name', 'status', 'error', 'bytes', 'duration'}
+        """
+        if apps is None:
+            apps = self.migrator.get_cloud_flow_list()
+        pending = self.plan(apps)
+        events.info('backup', f"[备份] {self.migrator.account}: 共 {len(apps)} 个应用，"
+                    f"需要下载 {len(pending)} 个", account=self.migrator.account, total=len(apps),
+                    pending=len(pending))
+
+        # 账号中已不存在的应用标记为已删除（保留备份文件）
+        present = {app['appId'] for app in apps}
+        for app_id, entry in self.manifest['apps'].items():
+            if app_id not in present and not entry.get('deleted'):
+                entry['deleted'] = True
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as pool:
+                results = list(pool.map(self._backup_one, pending))
+        finally:
+            self.save()
+        return results
+
+    def _backup_one(self, app):
+        app_id = app['appId']
+        start = time.time()
+        error = None
+        size = 0
+        try:
+            bot_data = self.migrator.fetch_package_bot(app_id)
+            if bot_data:
+                size = len(bot_data)
+                self._store(app, bot_data)
+            else:
+                error = "下载 package.bot 失败"
+        except Exception as e:
+            error = str(e)
+
+        if error:
+            events.error('backup', f"[错误] 备份 {app.get('appName')} 失败: {error}", flow=app_id,
+                         outcome='failed', error=error)
+        return {
+            'id': app_id,
+            'name': app.get('appName'),
+            'status': 'failed' if error else 'ok',
+            'error': error,
+            'bytes': size,
+            'duration': round(time.time() - start, 3)
+        }
+
+    def _store(self, app, bot_data):
+        entry = {field: app.get(field) for field in MANIFEST_FIELDS}
+        entry.update({
+            'size': len(bot_data),
+            'sha256': hashlib.sha256(bot_data).hexdigest(),
+            'backed_up': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        if self.chunk_store is not None:
+            entry['snapshot'] = self.chunk_store.add_bot(bot_data, f"{app.get('appName')} {app.get('versionId')}")
+        else:
+            _write_atomic(self.bot_path(app['appId']), bot_data)
+            entry['file'] = os.path.relpath(self.bot_path(app['appId']), self.root).replace(os.sep, '/')
+
+        with self._lock:
+            previous = self.manifest['apps'].get(app['appId']) or {}
+            # 去重存储保留历史版本的快照
+            history = list(previous.get('history', []))
+            if previous.get('snapshot') and previous['snapshot'] != entry.get('snapshot'):
+                history.append({'snapshot': previous['snapshot'], 'versionId': previous.get('versionId'),
+                                'updateTime': previous.get('updateTime')})
+            if history:
+                entry['history'] = history
+            self.manifest['apps'][app['appId']] = entry
+
+    def save(self):
+        """写入清单"""
+        with self._lock:
+            self.manifest['account'] = self.migrator.account
+            self.manifest['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            data = json.dumps(self.manifest, ensure_ascii=False, indent=1).encode('utf-8')
+        _write_atomic(self.manifest_path, data)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+云端流程目录缓存
+按账号把 develop/list 的结果缓存到磁盘，界面切换到云端视图时先显示缓存，再在后台刷新；
+命令行删除等只需较新列表的场合用 get()，缓存在 CATALOG_TTL 内时不请求服务端。
+只有完整获取的列表才写入缓存，某一页请求失败时不覆盖已有缓存。
+
+增量刷新：列表按更新时间从新到旧排列，新增或修改过的流程都在最前面，
+所以只需从第一页往后取，直到遇到缓存中 updateTime 相同的流程为止，其余部分沿用缓存。
+合并后的数量与服务端总数不一致（有流程被删除）时改为完整刷新。
+"""
+import os
+import json
+import time
+import threading
+
+from flow_events import events
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_cache')
+
+CATALOG_VERSION = 1
+
+# 缓存在这段时间内视为最新，不刷新（秒）
+CATALOG_TTL = 300
+
+
+def _app_key(app):
+    return app.get('appId'), app.get('updateTime')
+
+
+class CatalogCache:
+    """按账号缓存的云端流程目录
+
+    Args:
+        cache_dir: 缓存目录，每个账号一个 JSON 文件
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CATALOG_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def _path(self, migrator):
+        account = (migrator.account or '').replace('/', '_').replace('\\', '_')
+        return os.path.join(self.cache_dir, f"{account}.json")
+
+    def load(self, migrator):
+        """读取账号的缓存，没有（或接口地址不同）时返回 None
+
+        Returns:
+            dict: {'account', 'base_url', 'fetched', 'apps'}
+        """
+        path = self._path(migrator)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if catalog.get('version') != CATALOG_VERSION or catalog.get('base_url') != migrator.base_url:
+            return None
+        return catalog
+
+    def cached_apps(self, migrator):
+        """缓存中的流程列表（没有缓存时为 None），用于界面立即显示"""
+        catalog = self.load(migrator)
+        return catalog['apps'] if catalog else None
+
+    def save(self, migrator, apps, fetched=None):
+        catalog = {'version': CATALOG_VERSION, 'account': migrator.account, 'base_url': migrator.base_url,
+                   'fetched': fetched or time.time(), 'apps': apps}
+        path = self._path(migrator)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def remove(self, migrator, app_ids):
+        """从缓存中去掉已删除的流程（之后的增量刷新不必因数量不一致而完整刷新）"""
+        catalog = self.load(migrator)
+        if catalog:
+            app_ids = set(app_ids)
+            # 保留原来的获取时间，删除不代表缓存变新
+            self.save(migrator, [app for app in catalog['apps'] if app.get('appId') not in app_ids],
+                      catalog['fetched'])
+
+    def get(self, migrator, max_age=CATALOG_TTL):
+        """获取流程列表：缓存未过期时直接返回，否则增量刷新"""
+        catalog = self.load(migrator)
+        if catalog and time.time() - catalog['fetched'] < max_age:
+            return catalog['apps']
+        return self.refresh(migrator, catalog)
+
+    def refresh(self, migrator, catalog=None, full=False):
+        """刷新缓存并返回最新的流程列表
+
+        Args:
+            migrator: 已登录的 FlowMigrator
+            catalog: 已读取的缓存，为空时从磁盘读取
+            full: 是否完整刷新
+        """
+        if catalog is None and not full:
+            catalog = self.load(migrator)
+        if catalog and not full:
+            apps = self._refresh_incremental(migrator, catalog['apps'])
+            if apps is not None:
+                self.save(migrator, apps)
+                return apps
+
+        apps, complete = self._fetch_all(migrator)
+        if complete:
+            self.save(migrator, apps)
+        else:
+            # 列表不完整时不写入缓存，否则之后的增量刷新会沿用缺失的部分
+            events.warning('catalog', f"[警告] 流程列表获取不完整 ({len(apps)} 个)，未更新目录缓存",
+                           account=migrator.account, count=len(apps))
+        return apps
+
+    def _fetch_all(self, migrator):
+        """逐页获取完整列表
+
+        Returns:
+            tuple: (流程列表, 是否所有页都获取成功)
+        """
+        apps = []
+        page = 1
+        total_pages = 1
+        while page <= total_pages:
+            result = migrator.get_cloud_flow_page(page)
+            if result is None:
+                return apps, False
+            app_list, page_info = result
+            total_pages = page_info.get('pages', 1)
+            apps.extend(app_list)
+            events.info('catalog', f"  获取第 {page}/{total_pages} 页，{len(app_list)} 个流程 (累计: {len(apps)})",
+                        account=migrator.account, page=page, pages=total_pages, count=len(app_list))
+            page += 1
+        return apps, True
+
+    def _refresh_incremental(self, migrator, cached):
+        """从第一页开始获取，遇到缓存中未变化的流程即停止；需要完整刷新时返回 None"""
+        known = {_app_key(app) for app in cached}
+        leading = []
+        page = 1
+        while True:
+            result = migrator.get_cloud_flow_page(page)
+            if result is None:
+                return None
+            app_list, page_info = result
+            total = page_info.get('total', 0)
+
+            reached_known = False
+            for app in app_list:
+                if _app_key(app) in known:
+                    reached_known = True
+                    break
+                leading.append(app)
+            if reached_known or page >= page_info.get('pages', 1):
+                break
+            page += 1
+
+        changed = {app.get('appId') for app in leading}
+        apps = leading + [app for app in cached if app.get('appId') not in changed]
+        if len(apps) != total:
+            events.info('catalog', f"  目录缓存与服务端数量不一致 ({len(apps)}/{total})，完整刷新",
+                        account=migrator.account, cached=len(apps), total=total)
+            return None
+        events.info('catalog', f"  增量刷新: {page} 页，{len(leading)} 个新增或修改的流程",
+                    account=migrator.account, pages=page, changed=len(leading), total=total)
+        return apps
+
+
+# 默认目录缓存
+catalog_cache = CatalogCache()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+结构化事件日志
+迁移过程中的日志以事件形式发出 (stage/flow/account/bytes/duration/outcome 等字段)，
+由各个输出端决定如何呈现：控制台只显示可读的消息，JSON Lines 文件保存完整字段，
+便于批量任务结束后统计、画图。
+"""
+import sys
+import json
+import time
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning', ERROR: 'error'}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+# 没有任何输出端时的阈值，所有事件都被直接丢弃
+_DISABLED = ERROR + 1
+
+
+class EventLog:
+    """事件分发器
+
+    每个输出端有自己的级别，低于所有输出端级别的事件在 emit() 开头即返回；
+    代价较高的调试信息应先用 enabled() 判断，关闭时完全不产生开销。
+    """
+
+    def __init__(self):
+        self._sinks = []
+        self._threshold = _DISABLED
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink, level=INFO):
+        """添加输出端
+
+        Args:
+            sink: sink(record)，record 为事件字典
+            level: 该输出端接收的最低级别
+        """
+        with self._lock:
+            self._sinks = self._sinks + [(sink, level)]
+            self._threshold = min(sink_level for _, sink_level in self._sinks)
+        return sink
+
+    def remove_sink(self, sink):
+        """移除输出端"""
+        with self._lock:
+            self._sinks = [(s, level) for s, level in self._sinks if s is not sink]
+            self._threshold = min((level for _, level in self._sinks), default=_DISABLED)
+
+    def set_level(self, sink, level):
+        """修改输出端的级别"""
+        with self._lock:
+            self._sinks = [(s, level if s is sink else old) for s, old in self._sinks]
+            self._threshold = min((level for _, level in self._sinks), default=_DISABLED)
+
+    def enabled(self, level):
+        """是否有输出端接收该级别的事件"""
+        return level >= self._threshold
+
+    def emit(self, level, event, message=None, **fields):
+        """发出事件
+
+        Args:
+            level: 级别 (DEBUG/INFO/WARNING/ERROR)
+            event: 事件类型，如 login、stage、transfer、flow
+            message: 可读消息（控制台显示的内容），可为空
+            **fields: 结构化字段，值为 None 的字段会被忽略
+        """
+        if level < self._threshold:
+            return
+
+        record = {'ts': round(time.time(), 6), 'level': LEVEL_NAMES.get(level, level), 'event': event}
+        for key, value in fields.items():
+            if value is not None:
+                record[key] = value
+        if message is not None:
+            record['message'] = message
+
+        for sink, sink_level in self._sinks:
+            if level >= sink_level:
+                sink(record)
+
+    def debug(self, event, message=None, **fields):
+        self.emit(DEBUG, event, message, **fields)
+
+    def info(self, event, message=None, **fields):
+        self.emit(INFO, event, message, **fields)
+
+    def warning(self, event, message=None, **fields):
+        self.emit(WARNING, event, message, **fields)
+
+    def error(self, event, message=None, **fields):
+        self.emit(ERROR, event, message, **fields)
+
+
+class ConsoleSink:
+    """控制台输出：只打印带可读消息的事件"""
+
+    def __init__(self, stream=None):
+        # 为空时每次写入都取当前的 sys.stdout（兼容 redirect_stdout）
+        self.stream = stream
+
+    def __call__(self, record):
+        message = record.get('message')
+        if message is None:
+            return
+        stream = self.stream or sys.stdout
+        stream.write(message + "\n")
+
+
+class JsonLinesSink:
+    """JSON Lines 文件输出：每个事件一行完整 JSON（线程安全）"""
+
+    def __init__(self, path, mode='a'):
+        self.path = path
+        self._file = open(path, mode, encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+# 默认事件日志：控制台显示 INFO 及以上的消息
+events = EventLog()
+console_sink = events.add_sink(ConsoleSink(), INFO)
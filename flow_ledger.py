@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+迁移任务账本
+用 SQLite 记录批量迁移中每个流程完成到哪一步（已上传 .bot / 已上传 .json / 已创建应用）
+以及生成的新 appId、名称和 package.json。命令行或界面中途退出后，
+重新执行同一任务会从断点继续：已创建的流程直接跳过，已上传的文件不再重复上传，
+也不会因为重新生成 uuid 和 "_云迁_接收于" 名称而产生重复应用。
+同步记录 (sync_map) 保存源流程及其版本对应的目标应用，供增量同步判断哪些流程无需再迁移。
+"""
+import os
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import quote
+
+DEFAULT_LEDGER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrate_ledger.db')
+
+# 流程在账本中的阶段（按先后顺序）
+LEDGER_STAGES = ('prepared', 'uploaded_bot', 'uploaded_json', 'created')
+
+LEDGER_STAGE_NAMES = {
+    'prepared': '已生成新应用ID',
+    'uploaded_bot': '已上传 package.bot',
+    'uploaded_json': '已上传 package.json',
+    'created': '已创建应用'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    command TEXT NOT NULL,
+    source TEXT,
+    target TEXT,
+    status TEXT NOT NULL DEFAULT 'running',
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_flows (
+    job_id TEXT NOT NULL,
+    flow_id TEXT NOT NULL,
+    name TEXT,
+    stage TEXT NOT NULL,
+    new_app_id TEXT NOT NULL,
+    new_name TEXT NOT NULL,
+    package_data TEXT NOT NULL,
+    file_key_md5 TEXT,
+    expires REAL,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (job_id, flow_id)
+);
+CREATE TABLE IF NOT EXISTS sync_map (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    version TEXT,
+    stat TEXT,
+    target_app_id TEXT NOT NULL,
+    name TEXT,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (source, target, source_id)
+);
+"""
+
+
+SYNC_RECORDS_SQL = ('SELECT source_id, version, stat, target_app_id, name, updated FROM sync_map '
+                    'WHERE source = ? AND target = ?')
+
+
+def read_sync_records(path, source, target):
+    """只读地获取同步记录（用于试运行：账本不存在时返回空，不创建、不修改账本）"""
+    if path != ':memory:' and not os.path.exists(path):
+        return {}
+    try:
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return {}
+    try:
+        conn.row_factory = sqlite3.Row
+        # 旧账本可能缺少 stat 列，按实际的列读取
+        rows = conn.execute('SELECT * FROM sync_map WHERE source = ? AND target = ?', (source, target)).fetchall()
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+    return {row['source_id']: dict({'stat': None}, **{key: row[key] for key in row.keys()
+                                                      if key not in ('source', 'target', 'source_id')})
+            for row in rows}
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def stage_reached(entry, stage):
+    """账本记录是否已完成某个阶段"""
+    return entry is not None and LEDGER_STAGES.index(entry['stage']) >= LEDGER_STAGES.index(stage)
+
+
+class JobLedger:
+    """任务账本（线程安全，所有写入立即提交）
+
+    Args:
+        path: SQLite 文件路径，':memory:' 表示只在内存中
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        # 旧账本缺少的列：job_flows.expires（已上传文件的预签名地址最早过期时间）、sync_map.stat（本地流程的文件状态）
+        for table, column, kind in (('job_flows', 'expires', 'REAL'), ('sync_map', 'stat', 'TEXT')):
+            columns = {row['name'] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def create_job(self, command, source=None, target=None, job_id=None):
+        """新建任务，返回 MigrationJob"""
+        job_id = job_id or datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        now = _now()
+        self._execute('INSERT INTO jobs (job_id, command, source, target, status, created, updated) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?)', (job_id, command, source, target, 'running', now, now))
+        return MigrationJob(self, job_id)
+
+    def open_job(self, job_id, command=None, source=None, target=None):
+        """打开任务；不存在时按 job_id 新建（用于命令行 --job）"""
+        if self.get_job(job_id):
+            self._execute("UPDATE jobs SET status = 'running', updated = ? WHERE job_id = ?", (_now(), job_id))
+            return MigrationJob(self, job_id)
+        return self.create_job(command, source, target, job_id)
+
+    def resume_or_create(self, command, source=None, target=None, flow_ids=None):
+        """继续同类的最近一个未完成任务，没有时新建
+
+        Args:
+            flow_ids: 本次要迁移的流程；给出时只继续其中有流程尚未完成的任务，
+                      以免重新迁移已在旧任务中完成的流程时被当作"任务中已完成"跳过
+        """
+        rows = self._query("SELECT job_id FROM jobs WHERE status != 'finished' AND command = ? "
+                           "AND source IS ? AND target IS ? ORDER BY updated DESC",
+                           (command, source, target))
+        for row in rows:
+            job = MigrationJob(self, row['job_id'])
+            if flow_ids is None or job.unfinished_flows() & {str(flow_id) for flow_id in flow_ids}:
+                return job
+        return self.create_job(command, source, target)
+
+    def get_job(self, job_id):
+        rows = self._query('SELECT * FROM jobs WHERE job_id = ?', (job_id,))
+        return rows[0] if rows else None
+
+    def jobs(self, unfinished_only=False):
+        sql = 'SELECT * FROM jobs'
+        if unfinished_only:
+            sql += " WHERE status != 'finished'"
+        return self._query(sql + ' ORDER BY updated DESC')
+
+    def sync_records(self, source, target):
+        """同步记录 {源流程ID: {'version', 'stat', 'target_app_id', 'name', 'updated'}}
+
+        Args:
+            source: 源账号（本地流程为 'local'）
+            target: 目标账号
+        """
+        rows = self._query(SYNC_RECORDS_SQL, (source, target))
+        return {row.pop('source_id'): row for row in rows}
+
+    def record_sync(self, source, target, source_id, version, target_app_id, name=None, stat=None):
+        """记录源流程（及其版本）已同步为目标账号中的某个应用
+
+        Args:
+            stat: 计算版本时源文件的状态（见 migrate_flow.local_flow_stat），状态不变时不必重新计算版本
+        """
+        self._execute('INSERT OR REPLACE INTO sync_map (source, target, source_id, version, stat, target_app_id, '
+                      'name, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                      (source, target, str(source_id), version, stat, target_app_id, name, _now()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MigrationJob:
+    """账本中的一个任务"""
+
+    def __init__(self, ledger, job_id):
+        self.ledger = ledger
+        self.job_id = job_id
+
+    def get(self, flow_id):
+        """流程的记录，没有时返回 None；package_data 已解析为字典"""
+        rows = self.ledger._query('SELECT * FROM job_flows WHERE job_id = ? AND flow_id = ?',
+                                  (self.job_id, str(flow_id)))
+        if not rows:
+            return None
+        entry = rows[0]
+        entry['package_data'] = json.loads(entry['package_data'])
+        return entry
+
+    def prepare(self, flow_id, name, new_app_id, new_name, package_data):
+        """记录新生成的 appId / 名称 / package.json（在任何上传之前）"""
+        self.ledger._execute(
+            'INSERT OR REPLACE INTO job_flows (job_id, flow_id, name, stage, new_app_id, new_name, '
+            'package_data, file_key_md5, expires, updated) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?)',
+            (self.job_id, str(flow_id), name, 'prepared', new_app_id, new_name,
+             json.dumps(package_data, ensure_ascii=False), _now()))
+        self._touch()
+
+    def advance(self, flow_id, stage, file_key_md5=None, expires=None):
+        """流程完成某个阶段
+
+        Args:
+            expires: 本阶段上传所用预签名地址的过期时间戳，记录已上传文件中最早的一个
+        """
+        if stage not in LEDGER_STAGES:
+            raise ValueError(f"未知的阶段: {stage}")
+        self.ledger._execute(
+            'UPDATE job_flows SET stage = ?, file_key_md5 = COALESCE(?, file_key_md5), '
+            'expires = COALESCE(MIN(expires, ?), ?, expires), updated = ? WHERE job_id = ? AND flow_id = ?',
+            (stage, file_key_md5, expires, expires, _now(), self.job_id, str(flow_id)))
+        self._touch()
+
+    def unfinished_flows(self):
+        """尚未创建应用的流程ID"""
+        rows = self.ledger._query("SELECT flow_id FROM job_flows WHERE job_id = ? AND stage != 'created'",
+                                  (self.job_id,))
+        return {row['flow_id'] for row in rows}
+
+    def _touch(self):
+        self.ledger._execute('UPDATE jobs SET updated = ? WHERE job_id = ?', (_now(), self.job_id))
+
+    def finish(self):
+        """标记任务结束（之后不会再被 resume_or_create 继续）"""
+        self.ledger._execute("UPDATE jobs SET status = 'finished', updated = ? WHERE job_id = ?",
+                             (_now(), self.job_id))
+
+    def summary(self):
+        """各阶段的流程数"""
+        rows = self.ledger._query('SELECT stage, COUNT(*) AS count FROM job_flows WHERE job_id = ? GROUP BY stage',
+                                  (self.job_id,))
+        return {row['stage']: row['count'] for row in rows}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+分阶段流水线
+把每个任务分成若干阶段（如 下载 -> 重新打包 -> 上传），每个阶段有自己的工作线程，阶段之间用有界队列连接。
+不同任务的不同阶段同时进行：第 N+1 个流程下载时，第 N 个在重新打包，第 N-1 个在上传，网络和 CPU 同时忙碌。
+下游处理不过来时上游阻塞在队列上（背压），同时在处理中的任务数有上限
+（各阶段线程数 + 各队列容量），内存占用不随批次大小增长。
+"""
+import queue
+import threading
+
+# 通知工作线程退出
+_STOP = object()
+
+# 工作线程检查停止标志的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+def _put(q, item, stop):
+    """放入队列，队列已满时等待；停止后放弃"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return
+        except queue.Full:
+            continue
+
+
+class Stage:
+    """流水线阶段
+
+    Args:
+        name: 阶段名称（用于线程名）
+        func: func(state) -> bool，返回 False 时任务在该阶段结束，不再进入后面的阶段
+        workers: 该阶段的工作线程数
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+def run_pipeline(items, stages, queue_size=2, on_done=None):
+    """按阶段处理所有任务
+
+    Args:
+        items: 每个任务的状态字典，依次传给各阶段的 func
+        stages: Stage 列表
+        queue_size: 相邻阶段之间队列的容量
+        on_done: on_done(state)，任务结束（完成所有阶段、在某阶段返回 False 或抛出异常）时在工作线程中调用
+
+    Returns:
+        list: items（与输入顺序一致）；状态中 'stage' 为任务结束时所在的阶段，
+              抛出异常时 'error' 为异常信息
+
+    按 Ctrl+C（主线程在等待时收到 KeyboardInterrupt）、某个阶段抛出非 Exception 的异常或 on_done 抛出异常时，
+    通知所有工作线程停止：正在处理的任务做完当前阶段，队列中剩余的任务不再处理，
+    等所有线程结束后重新抛出该异常，不会在退出后仍有线程继续上传或创建应用。
+    """
+    # 第一个阶段的输入是全部任务，之后的队列有界
+    queues = [queue.Queue()] + [queue.Queue(maxsize=max(1, queue_size)) for _ in stages[1:]]
+    for item in items:
+        queues[0].put(item)
+    stop = threading.Event()
+    aborted = []
+
+    def work(index):
+        stage = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        while not stop.is_set():
+            try:
+                state = inbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if state is _STOP:
+                return
+            state['stage'] = stage.name
+            try:
+                passed = stage.func(state)
+            except Exception as e:
+                state['error'] = str(e)
+                passed = False
+            except BaseException as e:
+                aborted.append(e)
+                stop.set()
+                return
+            if passed and outbox is not None:
+                # 下游队列已满时在此等待
+                _put(outbox, state, stop)
+            elif on_done:
+                try:
+                    on_done(state)
+                except BaseException as e:
+                    # 回调出错时与阶段抛出非 Exception 的异常相同：停止整个流水线，结束后重新抛出
+                    aborted.append(e)
+                    stop.set()
+                    return
+
+    threads = [[threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)] for index, stage in enumerate(stages)]
+
+    try:
+        # 启动过程中按 Ctrl+C 时，已启动的线程同样要停止
+        for stage_threads in threads:
+            for thread in stage_threads:
+                thread.start()
+        # 上一阶段的线程全部结束后，再通知下一阶段退出
+        for index, stage in enumerate(stages):
+            for _ in range(stage.workers):
+                _put(queues[index], _STOP, stop)
+            for thread in threads[index]:
+                thread.join()
+    except BaseException as e:
+        aborted.append(e)
+        stop.set()
+        for stage_threads in threads:
+            for thread in stage_threads:
+                if thread.ident is not None:
+                    thread.join()
+    if aborted:
+        raise aborted[0]
+    return items
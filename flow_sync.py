@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+跨账号同步计划
+比较源账号和目标账号的云端流程列表，找出目标账号缺少或已过期的流程，只迁移这些流程。
+
+匹配依据（按优先级）:
+  1. 同步记录（任务账本 sync_map 表）: 源 appId -> 迁移生成的目标 appId，以及迁移时的源版本
+  2. 没有记录时按名称: 目标账号中存在同名流程或 "<名称>_云迁_接收于..." 副本
+源版本取列表中的 versionId 和 updateTime（发布后生成新版本，修改后更新时间变化），不需要下载流程即可判断是否变化。
+计划只做字典查找，数千个流程也在毫秒级完成。
+已变化的流程会迁移为新的 "_云迁_接收于..." 副本，上次同步的旧副本默认留在目标账号中
+（sync 命令在结果的 stale 中列出，--replace 时移入回收站）。
+"""
+import re
+
+# 迁移生成的名称后缀，见 FlowMigrator._prepare_identity
+MIGRATED_NAME_RE = re.compile(r'^(?P<name>.*)_云迁_接收于\d{4}年\d{2}月\d{2}日 \d{2}时\d{2}分\d{2}秒$')
+
+SYNC_ACTIONS = ('new', 'changed', 'unchanged', 'present')
+
+SYNC_ACTION_NAMES = {
+    'new': '新增',
+    'changed': '已变化',
+    'unchanged': '未变化',
+    'present': '目标已有同名流程'
+}
+
+# 需要迁移的动作
+SYNC_MIGRATE_ACTIONS = ('new', 'changed')
+
+
+def flow_version(flow):
+    """云端流程的内容版本："versionId|updateTime"
+
+    与备份（flow_backup.is_current）的判断一致：只修改未发布的流程 versionId 不变，但 updateTime 会变化。
+    """
+    return f"{flow.get('versionId') or ''}|{flow.get('updateTime') or ''}"
+
+
+def original_name(name):
+    """去掉迁移时添加的 "_云迁_接收于..." 后缀"""
+    match = MIGRATED_NAME_RE.match(name or '')
+    return match.group('name') if match else name
+
+
+def plan_sync(source_flows, target_flows, records=None):
+    """计算同步计划
+
+    Args:
+        source_flows: 源账号流程列表 (get_cloud_flow_list)
+        target_flows: 目标账号流程列表 (get_cloud_flow_list)
+        records: 同步记录 {源 appId: {'version', 'target_app_id'}}，见 JobLedger.sync_records
+
+    Returns:
+        list: 与 source_flows 顺序一致的 {'flow', 'action', 'target_app_id', 'reason'}
+    """
+    records = records or {}
+    target_ids = {flow.get('appId') for flow in target_flows}
+    target_by_name = {}
+    for flow in target_flows:
+        target_by_name.setdefault(original_name(flow.get('appName')), flow.get('appId'))
+
+    plan = []
+    for flow in source_flows:
+        record = records.get(flow.get('appId'))
+        if record and record['target_app_id'] in target_ids:
+            if record['version'] == flow_version(flow):
+                action, target_app_id, reason = 'unchanged', record['target_app_id'], "同步记录中的版本未变化"
+            else:
+                action, target_app_id, reason = 'changed', record['target_app_id'], "源流程版本已变化"
+        elif record:
+            action, target_app_id, reason = 'new', None, "上次同步的目标流程已不存在"
+        elif flow.get('appName') in target_by_name:
+            action, target_app_id, reason = 'present', target_by_name[flow.get('appName')], "按名称匹配"
+        else:
+            action, target_app_id, reason = 'new', None, "目标账号中没有该流程"
+        plan.append({'flow': flow, 'action': action, 'target_app_id': target_app_id, 'reason': reason})
+    return plan
+
+
+def plan_summary(plan):
+    """各动作的流程数"""
+    summary = {action: 0 for action in SYNC_ACTIONS}
+    for entry in plan:
+        summary[entry['action']] += 1
+    return summary
+
+
+def plan_rows(plan):
+    """便于输出 JSON 的计划（不含完整流程信息）"""
+    return [{'id': entry['flow'].get('appId'), 'name': entry['flow'].get('appName'),
+             'version': flow_version(entry['flow']), 'action': entry['action'],
+             'target_app_id': entry['target_app_id'], 'reason': entry['reason']}
+            for entry in plan]
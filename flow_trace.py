@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+迁移阶段计时
+记录嵌套的计时区间 (span)，包括耗时、传输字节数、重试次数和合并的请求数，
+可导出为 Chrome trace-event JSON，在 chrome://tracing 或 Perfetto 中查看整个批次。
+关闭时 span() 返回共享的空对象，几乎没有开销。
+"""
+import os
+import json
+import time
+import threading
+import functools
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ('name', 'cat', 'start', 'end', 'tid', 'args')
+
+    def __init__(self, name, cat, tid, args):
+        self.name = name
+        self.cat = cat
+        self.tid = tid
+        self.args = args
+        self.start = 0
+        self.end = 0
+
+    def add(self, **counters):
+        """累加计数，如 add(bytes=1024, retries=1)"""
+        for key, value in counters.items():
+            self.args[key] = self.args.get(key, 0) + value
+
+    def set(self, **fields):
+        """设置附加字段"""
+        self.args.update(fields)
+
+    @property
+    def duration(self):
+        return (self.end - self.start) / 1e9
+
+
+class _NoopSpan:
+    """关闭计时时使用的空区间"""
+
+    __slots__ = ()
+
+    def add(self, **counters):
+        pass
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ('tracer', 'span')
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        stack.append(self.span)
+        self.span.start = time.perf_counter_ns()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end = time.perf_counter_ns()
+        if exc_type is not None:
+            span.args['error'] = exc_type.__name__
+        self.tracer._stack().pop()
+        self.tracer.spans.append(span)
+        return False
+
+
+class Tracer:
+    """计时区间收集器（线程安全，每个线程各自维护嵌套关系）"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = []
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+        self._thread_names = {}
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            thread = threading.current_thread()
+            self._thread_names[thread.ident] = thread.name
+        return stack
+
+    def span(self, name, cat='migrate', /, **args):
+        """创建计时区间，用法: with tracer.span('upload_package_bot') as span: ..."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return _SpanContext(self, Span(name, cat, threading.get_ident(), args))
+
+    def current(self):
+        """当前线程最内层的区间（未开启或不在区间内时返回空区间）"""
+        if not self.enabled:
+            return NOOP_SPAN
+        stack = self._stack()
+        return stack[-1] if stack else NOOP_SPAN
+
+    def clear(self):
+        self.spans = []
+        self._origin = time.perf_counter_ns()
+
+    def summary(self):
+        """按区间名称汇总: {name: {'count', 'total', 'max', 'bytes', 'retries', 'coalesced'}}"""
+        result = {}
+        for span in list(self.spans):
+            item = result.setdefault(span.name, {'count': 0, 'total': 0.0, 'max': 0.0, 'bytes': 0, 'retries': 0,
+                                                 'coalesced': 0})
+            item['count'] += 1
+            item['total'] += span.duration
+            item['max'] = max(item['max'], span.duration)
+            item['bytes'] += span.args.get('bytes', 0)
+            item['retries'] += span.args.get('retries', 0)
+            item['coalesced'] += span.args.get('coalesced', 0)
+        return result
+
+    def to_chrome_trace(self):
+        """转换为 Chrome trace-event 格式"""
+        pid = os.getpid()
+        trace_events = []
+        for tid, name in self._thread_names.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        for span in sorted(list(self.spans), key=lambda s: s.start):
+            trace_events.append({
+                'name': span.name,
+                'cat': span.cat,
+                'ph': 'X',
+                'ts': (span.start - self._origin) / 1000,
+                'dur': (span.end - span.start) / 1000,
+                'pid': pid,
+                'tid': span.tid,
+                'args': span.args
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """导出 Chrome trace-event JSON 文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+
+
+def traced(name):
+    """方法装饰器：在 self.tracer 上为整个方法记录一个区间"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if not tracer.enabled:
+                return func(self, *args, **kwargs)
+            with tracer.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 默认计时器（关闭状态，命令行 --trace 时开启）
+tracer = Tracer()
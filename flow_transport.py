@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+HTTP 传输层
+FlowMigrator 的所有请求都经由 Transport 发出，可替换为：
+  RecordingTransport: 正常请求，同时把请求/响应记录到录像文件 (cassette)
+  ReplayTransport:    按录像文件在进程内回放响应，完全不产生网络 I/O
+回放时打包、解析和流程编排的耗时即为纯 CPU 开销，也可以在 CI 中确定性地跑完整协议。
+
+通过环境变量启用（对命令行、界面和脚本都生效）:
+    YINGDAO_CASSETTE=run.json YINGDAO_CASSETTE_MODE=record python migrate_flow.py ...
+    YINGDAO_CASSETTE=run.json python migrate_flow.py ...        # 默认回放
+
+默认传输层外面包一层 SingleFlightTransport：并发发出的相同只读请求（同一账号同时获取同一个应用详情、
+刷新按钮和同步同时获取流程列表等）只发出一次，结果共享给所有等待者。
+"""
+import os
+import re
+import json
+import atexit
+import base64
+import hashlib
+import threading
+from collections import defaultdict, deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# 2: 匹配键加入请求体和账号
+CASSETTE_VERSION = 2
+
+# 预签名 URL 中每次都会变化的参数，匹配时忽略
+VOLATILE_PARAMS = {'Expires', 'OSSAccessKeyId', 'Signature', 'security-token'}
+
+# 请求体中每次都会变化的字段（包含打包时间的包 MD5），匹配时忽略
+VOLATILE_FIELDS = {'packageMd5'}
+
+# 流程名称中的迁移时间（如 "_云迁_接收于2024年01月02日 03时04分05秒"），匹配时替换为占位符
+TIMESTAMP_RE = re.compile(r'\d{4}年\d{1,2}月\d{1,2}日 ?\d{1,2}时\d{1,2}分\d{1,2}秒')
+
+# 录像中需要隐去的请求头和表单字段
+SECRET_HEADERS = {'authorization', 'cookie', 'x-credential'}
+SECRET_FIELDS = {'password'}
+
+# 录制的是解码后的内容，回放时不能再带这些头
+DECODED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+# 只读的 POST 接口（请求参数在 JSON 中），可以合并并发的相同请求
+SINGLE_FLIGHT_POST_PATHS = ('/api/client/app/develop/list',)
+
+# 登录响应中的令牌（双 JSON 响应中可能出现多次）
+ACCESS_TOKEN_RE = re.compile(rb'("access_token"\s*:\s*")([^"]*)(")')
+
+UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+
+class CassetteMiss(LookupError):
+    """回放时找不到匹配的录像"""
+
+
+class Transport:
+    """直接发出请求的传输层（默认）
+
+    Args:
+        session: requests.Session，为空时使用 requests.request
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        if self.session is not None:
+            return self.session.request(method, url, **kwargs)
+        return requests.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+
+def request_key(method, url, params=None, json_body=None, form=None, account=None):
+    """录像匹配键：方法 + 规范化后的 URL + 请求体 + 账号
+
+    去掉预签名参数，查询参数排序，UUID（每次迁移新生成的 appId 等）替换为占位符；
+    JSON 请求体去掉 VOLATILE_FIELDS、按键排序后同样替换 UUID 和迁移时间，表单去掉密码。
+    同一接口的不同请求（不同页、isBot 不同、不同账号）因此各有各的键，并发时回放顺序也是确定的。
+
+    Args:
+        account: 发出请求的账号标识（见 account_alias），未登录的请求为空
+    """
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+    if params:
+        query += [(k, str(v)) for k, v in params.items() if v is not None]
+    path = UUID_RE.sub('{uuid}', parts.path)
+    query = UUID_RE.sub('{uuid}', urlencode(sorted(query)))
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, path, query, ''))}"
+    if json_body is not None:
+        body = json.dumps(_strip_volatile(json_body), sort_keys=True, ensure_ascii=False, default=str)
+        key += ' ' + TIMESTAMP_RE.sub('{time}', UUID_RE.sub('{uuid}', body))
+    if isinstance(form, dict):
+        fields = {k: v for k, v in form.items() if k not in SECRET_FIELDS}
+        key += ' ' + json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    if account:
+        key += f" @{account}"
+    return key
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def account_alias(username):
+    """录像中代替真实令牌的账号标识（同一账号每次录制都相同）"""
+    return 'replayed-' + hashlib.sha1(str(username).encode('utf-8')).hexdigest()[:12]
+
+
+def _bearer(headers):
+    """请求头中的令牌"""
+    auth = CaseInsensitiveDict(headers or {}).get('Authorization') or ''
+    return auth.split(' ', 1)[1] if ' ' in auth else None
+
+
+def _encode_body(data):
+    if not data:
+        return {'text': ''}
+    try:
+        return {'text': data.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(data).decode('ascii')}
+
+
+def _access_tokens(content):
+    """响应中出现的所有 access_token"""
+    return [match.group(2).decode('utf-8', 'replace') for match in ACCESS_TOKEN_RE.finditer(content)]
+
+
+def _redact_body(content, alias='replayed-token'):
+    """把登录响应中的 access_token 替换为账号标识
+
+    直接在原始字节上替换，不解析 JSON（登录可能返回两个连在一起的 JSON 对象）。
+    """
+    if b'access_token' not in content:
+        return content
+    return ACCESS_TOKEN_RE.sub(lambda match: match.group(1) + alias.encode('utf-8') + match.group(3), content)
+
+
+def _decode_body(body):
+    if 'base64' in body:
+        return base64.b64decode(body['base64'])
+    return body.get('text', '').encode('utf-8')
+
+
+def _body_size(data):
+    """请求体大小（不读取流式请求体）"""
+    if data is None:
+        return 0
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+
+def _kwargs_key(method, url, kwargs, account=None):
+    return request_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'), account)
+
+
+def _describe_request(method, url, kwargs, account=None):
+    """录像中保存的请求信息（隐去凭据，二进制请求体只记录大小）"""
+    headers = {k: ('***' if k.lower() in SECRET_HEADERS else v) for k, v in (kwargs.get('headers') or {}).items()}
+    request = {'method': method.upper(), 'url': url.split('?')[0], 'key': _kwargs_key(method, url, kwargs, account),
+               'headers': headers}
+    if kwargs.get('json') is not None:
+        request['json'] = kwargs['json']
+    data = kwargs.get('data')
+    if isinstance(data, dict):
+        request['form'] = {k: ('***' if k in SECRET_FIELDS else v) for k, v in data.items()}
+    elif data is not None:
+        request['body_size'] = _body_size(data)
+        if isinstance(data, bytes):
+            request['body_md5'] = hashlib.md5(data).hexdigest()
+    return request
+
+
+def _drain(data):
+    """回放时读完流式请求体，让上传进度回调照常触发"""
+    if data is None or isinstance(data, (bytes, str, dict)):
+        return
+    if hasattr(data, 'read'):
+        while data.read(64 * 1024):
+            pass
+    else:
+        for _ in data:
+            pass
+
+
+def build_response(status, headers, content, url):
+    """构造一个已读完内容的 requests.Response"""
+    response = requests.models.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response._content_consumed = True
+    response.url = url
+    response.encoding = get_encoding_from_headers(response.headers) or 'utf-8'
+    return response
+
+
+class RecordingTransport(Transport):
+    """录制传输层：请求照常发出，请求/响应写入录像文件
+
+    用法:
+        with RecordingTransport('run.json') as transport:
+            migrator = FlowMigrator(transport=transport)
+            ...
+    """
+
+    def __init__(self, path, inner=None):
+        super().__init__()
+        self.path = path
+        self.inner = inner or Transport()
+        self.interactions = []
+        # 真实令牌 -> 账号标识（回放时登录返回的就是账号标识）
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        response = self.inner.request(method, url, **kwargs)
+        # 读完内容（流式下载之后仍可 iter_content）
+        content = response.content
+        data = kwargs.get('data')
+        alias = account_alias(data.get('username')) if isinstance(data, dict) and data.get('username') else None
+        if alias:
+            with self._lock:
+                for token in _access_tokens(content):
+                    self._accounts[token] = alias
+        with self._lock:
+            account = self._accounts.get(_bearer(kwargs.get('headers')))
+        interaction = {
+            'request': _describe_request(method, url, kwargs, account),
+            'response': {
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() not in DECODED_HEADERS},
+                'body': _encode_body(_redact_body(content, alias or 'replayed-token'))
+            }
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return response
+
+    def save(self):
+        with self._lock:
+            cassette = {'version': CASSETTE_VERSION, 'interactions': list(self.interactions)}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(cassette, f, ensure_ascii=False, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+
+class ReplayTransport(Transport):
+    """回放传输层：按匹配键依次返回录制的响应，不发出任何网络请求
+
+    Args:
+        path: 录像文件
+        repeat: 某个匹配键的录像用完后是否重复最后一个响应（用于循环执行同一流程）
+    """
+
+    def __init__(self, path, repeat=True):
+        super().__init__()
+        self.path = path
+        self.repeat = repeat
+        with open(path, 'r', encoding='utf-8') as f:
+            cassette = json.load(f)
+        if cassette.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"不支持的录像版本: {cassette.get('version')}")
+
+        self._queues = defaultdict(deque)
+        self._last = {}
+        for interaction in cassette['interactions']:
+            self._queues[interaction['request']['key']].append(interaction['response'])
+        self._lock = threading.Lock()
+        self.played = 0
+
+    def request(self, method, url, **kwargs):
+        # 回放的登录响应中令牌就是账号标识
+        token = _bearer(kwargs.get('headers'))
+        account = token if token and token.startswith('replayed-') else None
+        key = _kwargs_key(method, url, kwargs, account)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                recorded = self._last[key] = queue.popleft()
+            elif self.repeat and key in self._last:
+                recorded = self._last[key]
+            else:
+                raise CassetteMiss(f"录像中没有匹配的请求: {key}")
+            self.played += 1
+
+        _drain(kwargs.get('data'))
+        return build_response(recorded['status'], recorded['headers'], _decode_body(recorded['body']), url)
+
+    def remaining(self):
+        """尚未回放的录像条数"""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+
+class _Flight:
+    """一个正在进行的请求"""
+
+    __slots__ = ('done', 'response', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlightTransport(Transport):
+    """合并并发相同请求的传输层
+
+    只读请求（不带请求体、非流式的 GET，以及 post_paths 中的 POST）正在进行时，
+    再发出的相同请求（方法、URL、参数、JSON 和 Authorization 都相同）不再发出，等待并共享第一个请求的结果；
+    第一个请求抛出的异常同样传给所有等待者。共享的响应带有 coalesced = True。
+
+    Args:
+        inner: 实际发出请求的传输层
+        post_paths: 可以合并的 POST 接口路径
+    """
+
+    def __init__(self, inner=None, post_paths=SINGLE_FLIGHT_POST_PATHS):
+        super().__init__()
+        self.inner = inner or Transport()
+        self.post_paths = tuple(post_paths)
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _flight_key(self, method, url, kwargs):
+        """可合并请求的键，不可合并时返回 None"""
+        method = method.upper()
+        if kwargs.get('data') is not None or kwargs.get('files') or kwargs.get('stream'):
+            return None
+        if method == 'POST':
+            if not urlsplit(url).path.endswith(self.post_paths):
+                return None
+        elif method != 'GET':
+            return None
+        headers = CaseInsensitiveDict(kwargs.get('headers') or {})
+        params = kwargs.get('params') or {}
+        return (method, url, json.dumps(params, sort_keys=True, default=str),
+                json.dumps(kwargs.get('json'), sort_keys=True, default=str), headers.get('Authorization'))
+
+    def request(self, method, url, **kwargs):
+        key = self._flight_key(method, url, kwargs)
+        if key is None:
+            return self.inner.request(method, url, **kwargs)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            shared = flight.response
+            response = build_response(shared.status_code, dict(shared.headers), shared.content, url)
+            response.coalesced = True
+            return response
+
+        try:
+            flight.response = self.inner.request(method, url, **kwargs)
+            # 读完内容，供等待者共享
+            flight.response.content
+            return flight.response
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """{'coalesced': 合并（未发出）的请求数, 'in_flight': 正在进行的可合并请求数}"""
+        with self._lock:
+            return {'coalesced': self.coalesced, 'in_flight': len(self._flights)}
+
+
+def transport_from_env():
+    """根据 YINGDAO_CASSETTE / YINGDAO_CASSETTE_MODE 环境变量创建传输层"""
+    path = os.environ.get('YINGDAO_CASSETTE')
+    if not path:
+        return Transport()
+    mode = os.environ.get('YINGDAO_CASSETTE_MODE', 'replay')
+    if mode == 'record':
+        recorder = RecordingTransport(path)
+        atexit.register(recorder.save)
+        return recorder
+    if mode == 'replay':
+        return ReplayTransport(path)
+    raise ValueError(f"YINGDAO_CASSETTE_MODE 只能是 record 或 replay: {mode}")
+
+
+# 默认传输层
+transport = SingleFlightTransport(transport_from_env())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+合成影刀流程数据生成器
+生成与 %LOCALAPPDATA%/ShadowBot/users/<user>/apps/<app>/xbot_robot/ 相同结构的目录，
+package.json 按真实流程的字段生成（依赖、子流程、uia 类型的分布参考 app_list.json），
+并附带可配置数量和大小的资源文件，用于对 LocalFlowScanner / create_package_bot 做规模测试。
+相同的种子总是生成相同的内容（包括文件修改时间）。
+
+用法:
+    python gen_shadowbot.py --base-path /tmp/shadowbot/users --users 3 --apps 100 --resources 20 --resource-size 64KB
+    然后 LocalFlowScanner(base_path='/tmp/shadowbot/users') 即可扫描
+"""
+import os
+import json
+import uuid
+import random
+import shutil
+import argparse
+from datetime import datetime, timedelta
+
+from fake_server import parse_size
+
+# 内部依赖包（取自 app_list.json 中出现频率较高的 internalDependencyPackage）
+DEPENDENCY_POOL = [
+    'shadowbot_file==23.7.1', 'shadowbot_file==25.6.1', 'web_action==25.3.1', 'web_action==25.7.0',
+    'activity_excel_v2==25.3.1', 'activity_excel_v2==25.9.0', 'activity_759a3f99==25.5.1',
+    'activity_pgsql==25.5.0', 'activity_4123271c==25.4.2', 'activity_7ce1d530==25.8.0',
+    'shadowbot_picture==25.1.0', 'activity_6093abac==25.4.0', 'activity_wps_jsa==24.8.0',
+    'official_account==24.8.0'
+]
+
+# uia 类型及权重（app_list.json: pc 172, PC 13, mobile 9）
+UIA_TYPES = [('PC', 185), ('Mobile', 9)]
+
+# 依赖个数及权重（约四分之一的流程没有依赖）
+DEPENDENCY_COUNTS = [(0, 52), (1, 100), (2, 32), (3, 10)]
+
+NAME_WORDS = ['订单', '报表', '发票', '库存', '考勤', '对账', '采购', '客户', '邮件', '数据', '同步', '导出',
+              '审批', '巡检', '价格', '物流', '合同', '工资', '上传', '下载']
+
+# 合成流程的时间范围（修改时间在此之前的一年内）
+EPOCH = datetime(2026, 2, 1, 9, 0, 0)
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_package_data(rng, app_id, name, flow_names):
+    """生成 package.json 内容（字段与客户端导出的 package.json 一致）"""
+    dependencies = rng.sample(DEPENDENCY_POOL, _weighted(rng, DEPENDENCY_COUNTS))
+    return {
+        "uuid": app_id,
+        "name": name,
+        "icon": None,
+        "version": str(rng.randint(1, 12)),
+        "tags": None,
+        "software": None,
+        "software_title": None,
+        "package_version": 5,
+        "feature_list": [2, 5],
+        "description": None,
+        "instruction": "",
+        "use_latest_pip": False,
+        "videoName": "",
+        "startup": "main",
+        "robot_type": "app",
+        "activity_code": None,
+        "flows": [
+            {"name": flow, "filename": flow, "kind": 'Visual' if i == 0 or rng.random() < 0.8 else 'Code',
+             "opened": i == 0, "groupName": None}
+            for i, flow in enumerate(flow_names)
+        ],
+        "flow_groups": [],
+        "variables": [
+            {"name": f"参数{i + 1}", "type": "str", "value": "", "direction": "In", "description": ""}
+            for i in range(rng.randint(0, 3))
+        ],
+        "external_dependencies": [],
+        "internaldependencies": dependencies,
+        "selectordependencies": [],
+        "internalautodependencies": [],
+        "ipaasDependencies": [],
+        "databook_columns": [],
+        "authority": "use",
+        "internalautoupgrade": False,
+        "isbrief": False,
+        "uia_type": _weighted(rng, UIA_TYPES),
+        "persist_databook": False,
+        "encrypt_bot": False,
+        "customItems": {"gifUrl": None, "videoUrl": "", "imageUrl": "", "imageName": ""},
+        "terminalTags": None
+    }
+
+
+def _flow_json(rng, flow_name, blocks):
+    return {
+        "name": flow_name,
+        "blocks": [
+            {"id": _uuid(rng), "name": rng.choice(['xbot_visual.web.browser.create', 'xbot_visual.excel.read',
+                                                    'programing.variable', 'programing.if', 'xbot_visual.win32.click']),
+             "inputs": {"value": f"{flow_name}_{i}"}, "line": i + 1}
+            for i in range(blocks)
+        ]
+    }
+
+
+def _resource(rng, index, size, compressible):
+    """资源文件：可压缩的元素库 XML 或不可压缩的图片样数据"""
+    if not compressible:
+        return rng.randbytes(size)
+    line = f'<Selector id="{index}" name="控件{index}" path="/Window/Pane[{rng.randint(1, 9)}]/Button" />\n'.encode('utf-8')
+    return (line * (size // len(line) + 1))[:size]
+
+
+def generate_robot(robot_path, rng, name=None, resources=10, resource_size=32 * 1024,
+                   compressible=0.5, max_flows=5, mtime=None, app_id=None):
+    """生成一个 xbot_robot 目录
+
+    Args:
+        robot_path: xbot_robot 目录路径
+        rng: random.Random 实例（决定全部内容）
+        name: 流程名称，为空时随机生成
+        resources: 资源文件数量
+        resource_size: 资源文件的平均大小（字节，实际在 50%~150% 之间）
+        compressible: 可压缩资源文件的比例
+        max_flows: 子流程数量上限（含 main）
+        mtime: 文件修改时间 (datetime)
+        app_id: 流程 uuid，为空时随机生成
+
+    Returns:
+        dict: package.json 内容
+    """
+    app_id = app_id or _uuid(rng)
+    name = name or ''.join(rng.sample(NAME_WORDS, 2)) + str(rng.randint(1, 999))
+    flow_names = ['main'] + [f"子流程{i}" for i in range(1, rng.randint(1, max_flows))]
+    package_data = make_package_data(rng, app_id, name, flow_names)
+
+    files = {
+        'package.json': json.dumps(package_data, ensure_ascii=False, indent=4).encode('utf-8'),
+        '__init__.py': b"# Generated by xbot\n",
+        'package.py': f"# {name}\nimport xbot\nfrom . import main\n".encode('utf-8'),
+        'settings.json': b'{\n  "topicUuid": null,\n  "CollegeGameInfo": null\n}',
+        'imagesV2.xml': b'<?xml version="1.0" encoding="utf-8"?>\n<Images />\n',
+        'selectorsV2.xml': ''.join(
+            f'<Selector id="{_uuid(rng)}" name="元素{i}" />\n' for i in range(rng.randint(1, 20))).encode('utf-8'),
+        'package.sigstore': rng.randbytes(152),
+        '.dev/workspace.state.json': json.dumps(
+            {"openedFlows": ["main"], "activeBottomPanel": "元素库", "activeFlow": "main"},
+            ensure_ascii=False, indent=2).encode('utf-8')
+    }
+    for flow in flow_names:
+        files[f"{flow}.pybx"] = rng.randbytes(rng.randint(200, 2000))
+        files[f".dev/{flow}.flow.json"] = json.dumps(
+            _flow_json(rng, flow, rng.randint(5, 60)), ensure_ascii=False).encode('utf-8')
+    for i in range(resources):
+        size = max(1, int(resource_size * rng.uniform(0.5, 1.5)))
+        is_text = rng.random() < compressible
+        files[f"resources/res_{i:04d}.{'xml' if is_text else 'png'}"] = _resource(rng, i, size, is_text)
+
+    timestamp = (mtime or EPOCH).timestamp()
+    for relpath, data in files.items():
+        path = os.path.join(robot_path, *relpath.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.utime(path, (timestamp, timestamp))
+    return package_data
+
+
+def generate_tree(base_path, users=1, apps=10, seed=0, **robot_options):
+    """生成 <base_path>/<user>/apps/<app>/xbot_robot 目录树
+
+    每个流程的内容只取决于 (seed, 用户序号, 流程序号)，增加 users/apps 不会改变已有流程。
+
+    Args:
+        base_path: 相当于 %LOCALAPPDATA%/ShadowBot/users
+        users: 用户数
+        apps: 每个用户的流程数
+        seed: 随机种子
+        **robot_options: 传给 generate_robot 的参数 (resources, resource_size, ...)
+
+    Returns:
+        list: [{'user_id', 'app_id', 'name', 'robot_path'}, ...]
+    """
+    generated = []
+    for u in range(users):
+        user_id = str(random.Random(f"{seed}:user:{u}").randint(100000000, 999999999))
+        for a in range(apps):
+            rng = random.Random(f"{seed}:{u}:{a}")
+            app_id = _uuid(rng)
+            robot_path = os.path.join(base_path, user_id, 'apps', app_id, 'xbot_robot')
+            mtime = EPOCH - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+            package_data = generate_robot(robot_path, rng, mtime=mtime, app_id=app_id, **robot_options)
+            generated.append({'user_id': user_id, 'app_id': app_id,
+                              'name': package_data['name'], 'robot_path': robot_path})
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成的影刀流程目录")
+    parser.add_argument('--base-path', required=True, help="输出目录（相当于 %%LOCALAPPDATA%%/ShadowBot/users）")
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--apps', type=int, default=10, help="每个用户的流程数")
+    parser.add_argument('--resources', type=int, default=10, help="每个流程的资源文件数")
+    parser.add_argument('--resource-size', default='32KB', help="资源文件平均大小，如 4KB、1MB")
+    parser.add_argument('--compressible', type=float, default=0.5, help="可压缩资源文件比例 (0~1)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clean', action='store_true', help="生成前清空输出目录")
+    args = parser.parse_args()
+
+    if args.clean and os.path.exists(args.base_path):
+        shutil.rmtree(args.base_path)
+
+    generated = generate_tree(args.base_path, args.users, args.apps, args.seed,
+                              resources=args.resources, resource_size=parse_size(args.resource_size),
+                              compressible=args.compressible)
+    print(f"[完成] 生成 {len(generated)} 个流程 -> {args.base_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+并发迁移压测 / 故障注入测试
+用大量并发的 migrate / migrate_from_cloud 流水线压本地模拟服务 (fake_server.py)，
+分三个阶段运行：预热（无故障）-> 故障（按概率注入慢响应、5xx、429、断开连接、
+过期的预签名 URL、登录返回拼接 JSON）-> 恢复（关闭故障），
+统计有效吞吐 (goodput)、浪费的传输字节和故障解除后的恢复时间。
+
+用法:
+    python load_test.py --concurrency 200 --chaos 30 --error 0.05 --drop 0.02 --expire 0.01
+    python load_test.py --json load_report.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_server import FakeYingdaoServer, FAULT_KINDS
+from flow_events import events, console_sink, WARNING
+from gen_shadowbot import generate_tree
+from migrate_flow import FlowMigrator, LocalFlowScanner, format_bytes
+
+# 默认故障概率（每个请求）
+DEFAULT_FAULTS = {
+    'slow': 0.02,
+    'error': 0.03,
+    'throttle': 0.03,
+    'drop': 0.01,
+    'expire': 0.01,
+    'double_json': 0.2
+}
+
+PHASES = ('warmup', 'chaos', 'recovery')
+
+
+class RetryCounter:
+    """统计重试事件的输出端"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        if record['event'] == 'retry':
+            with self._lock:
+                self.counts[record.get('reason', 'unknown')] += 1
+
+
+class LoadTest:
+    """压测运行器
+
+    Args:
+        server: 已启动的 FakeYingdaoServer
+        local_flows: LocalFlowScanner 扫描到的本地流程
+        cloud_flows: 源账号的云端流程
+        concurrency: 并发流水线数
+        cloud_ratio: migrate_from_cloud 所占比例
+        retry_backoff: 覆盖 FlowMigrator.retry_backoff
+    """
+
+    def __init__(self, server, local_flows, cloud_flows, concurrency=100, cloud_ratio=0.5,
+                 retry_backoff=None, seed=0):
+        self.server = server
+        self.local_flows = local_flows
+        self.cloud_flows = cloud_flows
+        self.concurrency = concurrency
+        self.cloud_ratio = cloud_ratio
+        self.retry_backoff = retry_backoff
+        self.random = random.Random(seed)
+        self.records = []
+        self.phase = PHASES[0]
+        self.marks = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self.source = self._migrator()
+        if not self.source.login('load-source', 'load'):
+            raise RuntimeError("源账号登录失败")
+
+    def _migrator(self):
+        migrator = FlowMigrator(base_url=self.server.url, auth_url=self.server.url)
+        if self.retry_backoff is not None:
+            migrator.retry_backoff = self.retry_backoff
+        return migrator
+
+    def _pick(self):
+        with self._lock:
+            if self.cloud_flows and self.random.random() < self.cloud_ratio:
+                return 'cloud', self.random.choice(self.cloud_flows)
+            return 'local', self.random.choice(self.local_flows)
+
+    def _pipeline(self, worker):
+        """执行一次完整的迁移（含登录），返回记录"""
+        kind, flow = self._pick()
+        phase = self.phase
+        start = time.perf_counter()
+        ok = False
+        error = None
+        try:
+            target = self._migrator()
+            if not target.login(f'load-target-{worker}', 'load'):
+                error = 'login_failed'
+            elif kind == 'cloud':
+                ok = target.migrate_from_cloud(flow, self.source)
+            else:
+                ok = target.migrate(flow)
+            if not ok and error is None:
+                error = 'failed'
+        except Exception as e:
+            error = type(e).__name__
+        end = time.perf_counter()
+        return {'kind': kind, 'phase': phase, 'start': start, 'end': end, 'ok': ok, 'error': error,
+                'bytes': flow.get('_bytes', 0)}
+
+    def _worker(self, worker):
+        while not self._stop.is_set():
+            record = self._pipeline(worker)
+            with self._lock:
+                self.records.append(record)
+
+    def run(self, warmup, chaos, recovery, faults):
+        """运行三个阶段
+
+        Returns:
+            dict: 报告（见 build_report）
+        """
+        retry_counter = events.add_sink(RetryCounter(), WARNING)
+        self.marks['start'] = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='load') as pool:
+                futures = [pool.submit(self._worker, i) for i in range(self.concurrency)]
+
+                time.sleep(warmup)
+                self.phase = 'chaos'
+                self.marks['chaos'] = time.perf_counter()
+                self.server.set_faults(**faults)
+
+                time.sleep(chaos)
+                self.server.clear_faults()
+                self.phase = 'recovery'
+                self.marks['recovery'] = time.perf_counter()
+
+                time.sleep(recovery)
+                self._stop.set()
+                for future in futures:
+                    future.result()
+            self.marks['end'] = time.perf_counter()
+        finally:
+            events.remove_sink(retry_counter)
+            self.server.clear_faults()
+        return build_report(self, retry_counter.counts)
+
+
+def _rate(records, start, end):
+    """[start, end) 内完成的成功迁移数/秒"""
+    if end <= start:
+        return 0.0
+    return sum(1 for r in records if r['ok'] and start <= r['end'] < end) / (end - start)
+
+
+def time_to_recover(records, marks, baseline_rate, window=1.0, target=0.9):
+    """故障解除后恢复正常所需的时间
+
+    从关闭故障开始，找到最早的时刻 t：此后不再有失败完成，且 [t, t+window) 内的成功吞吐
+    达到预热阶段的 target 倍。没有恢复时返回 None。
+    """
+    off = marks['recovery']
+    end = marks['end']
+    failures = [r['end'] for r in records if not r['ok'] and r['end'] >= off]
+    t = max(failures, default=off)
+    while t + window <= end:
+        if _rate(records, t, t + window) >= baseline_rate * target:
+            return round(t - off, 3)
+        t += window / 10
+    return None
+
+
+def build_report(test, retries):
+    records = test.records
+    marks = test.marks
+    server = test.server
+    bounds = {
+        'warmup': (marks['start'], marks['chaos']),
+        'chaos': (marks['chaos'], marks['recovery']),
+        'recovery': (marks['recovery'], marks['end'])
+    }
+
+    phases = {}
+    for phase, (start, end) in bounds.items():
+        finished = [r for r in records if start <= r['end'] < end]
+        good = [r for r in finished if r['ok']]
+        latencies = sorted(r['end'] - r['start'] for r in good)
+        duration = end - start
+        phases[phase] = {
+            'duration': round(duration, 3),
+            'completed': len(finished),
+            'succeeded': len(good),
+            'failed': len(finished) - len(good),
+            'goodput_flows_per_sec': round(len(good) / duration, 3) if duration else 0.0,
+            'goodput_mb_per_sec': round(sum(r['bytes'] for r in good) / duration / 1024 / 1024, 3) if duration else 0.0,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+            'errors': dict(Counter(r['error'] for r in finished if not r['ok']))
+        }
+
+    baseline_rate = _rate(records, *bounds['warmup'])
+    stats = server.stats
+    orphan = server.orphan_bytes()
+    return {
+        'concurrency': test.concurrency,
+        'phases': phases,
+        'time_to_recover': time_to_recover(records, marks, baseline_rate),
+        'server': {
+            'requests': stats['requests'],
+            'bytes_in': stats['bytes_in'],
+            'bytes_out': stats['bytes_out'],
+            'faults': dict(stats['faults'])
+        },
+        'wasted_bytes': {
+            'failed_requests': stats['wasted_bytes'],
+            'orphan_uploads': orphan,
+            'total': stats['wasted_bytes'] + orphan
+        },
+        'client_retries': dict(retries)
+    }
+
+
+def print_report(report, stream=None):
+    stream = stream or sys.stdout
+    stream.write(f"\n并发 {report['concurrency']}\n")
+    stream.write(f"{'阶段':<10}{'时长s':>8}{'完成':>8}{'成功':>8}{'失败':>8}{'流程/s':>9}{'MB/s':>8}{'p50ms':>9}{'p95ms':>9}\n")
+    stream.write("-" * 80 + "\n")
+    for phase, p in report['phases'].items():
+        stream.write(f"{phase:<12}{p['duration']:>8.1f}{p['completed']:>8}{p['succeeded']:>8}{p['failed']:>8}"
+                     f"{p['goodput_flows_per_sec']:>9.1f}{p['goodput_mb_per_sec']:>8.2f}"
+                     f"{p['p50_ms'] or 0:>9.0f}{p['p95_ms'] or 0:>9.0f}\n")
+        if p['errors']:
+            stream.write(f"{'':12}失败原因: {p['errors']}\n")
+
+    wasted = report['wasted_bytes']
+    server = report['server']
+    ttr = report['time_to_recover']
+    stream.write(f"\n注入故障: {server['faults']}\n")
+    stream.write(f"客户端重试: {report['client_retries']}\n")
+    stream.write(f"浪费字节: {format_bytes(wasted['total'])} (失败请求 {format_bytes(wasted['failed_requests'])}, "
+                 f"孤立上传 {format_bytes(wasted['orphan_uploads'])}) / 总传输 "
+                 f"{format_bytes(server['bytes_in'] + server['bytes_out'])}\n")
+    stream.write(f"恢复时间: {'未恢复' if ttr is None else f'{ttr:.2f}s'}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发迁移压测 / 故障注入测试")
+    parser.add_argument('--concurrency', type=int, default=100, help="并发流水线数 (默认 100)")
+    parser.add_argument('--warmup', type=float, default=5, help="预热阶段时长（秒）")
+    parser.add_argument('--chaos', type=float, default=20, help="故障阶段时长（秒）")
+    parser.add_argument('--recovery', type=float, default=10, help="恢复阶段时长（秒）")
+    parser.add_argument('--cloud-ratio', type=float, default=0.5, help="migrate_from_cloud 的比例")
+    parser.add_argument('--flows', type=int, default=20, help="本地/云端各准备的流程数")
+    parser.add_argument('--resources', type=int, default=5, help="每个流程的资源文件数")
+    parser.add_argument('--resource-size', type=int, default=16 * 1024, help="资源文件平均大小（字节）")
+    parser.add_argument('--latency', type=float, default=0.01, help="模拟服务每个请求的延迟（秒）")
+    parser.add_argument('--slow-delay', type=float, default=2.0, help="slow 故障的额外延迟（秒）")
+    parser.add_argument('--retry-backoff', type=float, help="覆盖 FlowMigrator 的重试退避基数（秒）")
+    for kind in FAULT_KINDS:
+        parser.add_argument(f'--{kind.replace("_", "-")}', type=float, default=DEFAULT_FAULTS[kind],
+                            help=f"{kind} 故障概率 (默认 {DEFAULT_FAULTS[kind]})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="把报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    # 数百个流水线的日志没有可读性，只输出报告
+    events.remove_sink(console_sink)
+
+    workdir = tempfile.mkdtemp(prefix='yd_load_')
+    server = FakeYingdaoServer(latency=args.latency, seed=args.seed)
+    server.slow_delay = args.slow_delay
+    server.start()
+    try:
+        base_path = os.path.join(workdir, 'users')
+        generate_tree(base_path, 1, args.flows, args.seed,
+                      resources=args.resources, resource_size=args.resource_size)
+        packer = FlowMigrator()
+        local_flows = LocalFlowScanner(base_path).scan_all_flows()
+        cloud_flows = []
+        for flow in local_flows:
+            bot_data = packer.create_package_bot(flow['robot_path'], flow['package_data'])
+            flow['_bytes'] = len(bot_data)
+            app_id = server.add_app('load-source', flow['name'], bot_data)
+            cloud_flows.append({'appId': app_id, 'appName': flow['name'], '_bytes': len(bot_data)})
+
+        faults = {kind: getattr(args, kind) for kind in FAULT_KINDS}
+        print(f"[压测] {server.url} 并发 {args.concurrency}，故障概率 {faults}")
+        test = LoadTest(server, local_flows, cloud_flows, args.concurrency, args.cloud_ratio,
+                        args.retry_backoff, args.seed)
+        report = test.run(args.warmup, args.chaos, args.recovery, faults)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,21 @@ import json
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
+from collections import deque
 
 # 导入核心功能
-from migrate_flow import FlowMigrator, LocalFlowScanner, encrypt_password
+from flow_search import FlowSearchIndex
+from flow_ledger import JobLedger
+from flow_catalog import catalog_cache
+from migrate_flow import (FlowMigrator, LocalFlowScanner, TransferProgress, encrypt_password, migrate_cloud_pipeline,
+                          format_bytes, format_progress_summary, STAGE_NAMES)
 
 # 配置文件路径
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'migrate_config.json')
 
+# 进度区域最多同时显示的流程数
+PROGRESS_ROWS = 4
+
 # 默认账号配置
 DEFAULT_ACCOUNTS = [
     {"name": "账号1", "username": "18760321694", "password": "Xuyilin00.."},
@@ -39,6 +47,62 @@ def save_config(config):
         json.dump(config, f, ensure_ascii=False, indent=2)
 
 
+class LogSink:
+    """批量刷新的日志输出
+
+    日志先进入内存队列，由 Tk 主循环按固定帧率合并写入文本控件，
+    避免每条日志都触发一次完整重绘。控件与待写队列都只保留最近
+    max_lines 行，长时间运行内存保持平稳。
+    write() 可以在任意线程调用。
+    """
+    
+    def __init__(self, root, text_widget, fps=20, max_lines=2000):
+        self.root = root
+        self.text_widget = text_widget
+        self.interval = max(1, int(1000 / fps))
+        self.max_lines = max_lines
+        # deque 的 append/popleft 是线程安全的；超过上限时自动丢弃最旧的日志
+        self._pending = deque(maxlen=max_lines)
+        self._line_count = 0
+        self.root.after(self.interval, self._tick)
+    
+    def write(self, message):
+        """追加一条日志（不立即刷新界面）"""
+        self._pending.append(message)
+    
+    def flush(self):
+        """把待写日志一次性写入控件"""
+        if not self._pending:
+            return
+        
+        lines = []
+        while self._pending:
+            try:
+                lines.append(self._pending.popleft())
+            except IndexError:
+                break
+        
+        widget = self.text_widget
+        widget.configure(state='normal')
+        widget.insert(tk.END, "\n".join(lines) + "\n")
+        self._line_count += sum(line.count("\n") + 1 for line in lines)
+        
+        # 环形淘汰：超出上限时删除最旧的行
+        overflow = self._line_count - self.max_lines
+        if overflow > 0:
+            widget.delete('1.0', f'{overflow + 1}.0')
+            self._line_count -= overflow
+        
+        widget.see(tk.END)
+        widget.configure(state='disabled')
+    
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self.root.after(self.interval, self._tick)
+
+
 class MigrateGUI:
     def __init__(self, root):
         self.root = root
@@ -54,7 +118,18 @@ class MigrateGUI:
         self.cloud_flows = []
         self.current_view = "local"  # local 或 cloud
         
+        # 后台任务状态及需要回到主线程执行的界面操作
+        self.busy = False
+        self._ui_calls = deque()
+        # 当前批次的迁移进度
+        self.progress = None
+        # 任务账本：界面中途退出后，再次迁移同类流程时从断点继续
+        self.ledger = JobLedger()
+        
         self.create_widgets()
+        self.log_sink = LogSink(self.root, self.log_text)
+        self.root.after(self.log_sink.interval, self._drain_ui_calls)
+        self.root.after(200, self._refresh_progress)
         self.refresh_local_flows()
     
     def create_widgets(self):
@@ -124,6 +199,17 @@ class MigrateGUI:
         self.view_label = ttk.Label(view_frame, text="当前: 本地流程", font=('', 10, 'bold'))
         self.view_label.pack(side=tk.LEFT, padx=20)
         
+        # 搜索框: 每次输入都即时过滤列表（名称/ID/用户/状态/时间，支持拼音）
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.apply_filter())
+        self.search_entry = ttk.Entry(view_frame, textvariable=self.search_var, width=30)
+        self.search_entry.pack(side=tk.RIGHT, padx=5)
+        # 云端视图中回车: 按名称在服务端搜索（大账号不必先获取全部流程）
+        self.search_entry.bind('<Return>', lambda event: self.search_cloud_flows())
+        ttk.Label(view_frame, text="搜索:").pack(side=tk.RIGHT)
+        self.match_label = ttk.Label(view_frame, text="", foreground="gray")
+        self.match_label.pack(side=tk.RIGHT, padx=5)
+        
         # ===== 流程列表 =====
         list_frame = ttk.LabelFrame(self.root, text="流程列表", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -152,6 +238,7 @@ class MigrateGUI:
         
         # 选中状态
         self.selected_items = set()
+        self.search_index = None
         
         # ===== 操作按钮 =====
         action_frame = ttk.Frame(self.root)
@@ -166,6 +253,22 @@ class MigrateGUI:
         self.delete_btn = ttk.Button(action_frame, text="删除选中(本地)", command=self.do_delete)
         self.delete_btn.pack(side=tk.LEFT, padx=5)
         
+        # ===== 进度区域 =====
+        progress_frame = ttk.LabelFrame(self.root, text="迁移进度", padding=(10, 5))
+        progress_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        # 固定数量的进度行，轮流显示正在处理的流程
+        self.progress_rows = []
+        for i in range(PROGRESS_ROWS):
+            name_label = ttk.Label(progress_frame, width=30)
+            stage_label = ttk.Label(progress_frame, width=12)
+            bar = ttk.Progressbar(progress_frame, length=300, maximum=100)
+            detail_label = ttk.Label(progress_frame, width=20)
+            self.progress_rows.append((name_label, stage_label, bar, detail_label))
+        
+        self.progress_summary = ttk.Label(progress_frame, text="")
+        self.progress_summary.grid(row=PROGRESS_ROWS, column=0, columnspan=4, sticky=tk.W)
+        
         # ===== 日志区域 =====
         log_frame = ttk.LabelFrame(self.root, text="操作日志", padding=10)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -174,12 +277,82 @@ class MigrateGUI:
         self.log_text.pack(fill=tk.BOTH, expand=True)
     
     def log(self, message):
-        """添加日志"""
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state='disabled')
-        self.root.update()
+        """添加日志（由 LogSink 按帧合并刷新，可在后台线程调用）"""
+        self.log_sink.write(message)
+    
+    def call_in_ui(self, func, *args):
+        """把界面操作交给主线程执行（后台线程不能直接操作 Tk 控件）"""
+        self._ui_calls.append((func, args))
+    
+    def _drain_ui_calls(self):
+        try:
+            while self._ui_calls:
+                func, args = self._ui_calls.popleft()
+                func(*args)
+        finally:
+            self.root.after(self.log_sink.interval, self._drain_ui_calls)
+    
+    def start_progress(self, flows):
+        """开始跟踪一批流程的进度
+        
+        Args:
+            flows: [(flow_id, name), ...]
+        """
+        self.progress = TransferProgress()
+        self.progress.begin(flows)
+        return self.progress
+    
+    def _refresh_progress(self):
+        """定时把进度数据绘制到进度条"""
+        try:
+            if self.progress:
+                snapshot = self.progress.snapshot()
+                running = [row for row in snapshot['flows']
+                           if not row['finished'] and row['stage'] != 'pending']
+                
+                for i, (name_label, stage_label, bar, detail_label) in enumerate(self.progress_rows):
+                    if i < len(running):
+                        row = running[i]
+                        name_label.config(text=row['name'][:30])
+                        stage_label.config(text=STAGE_NAMES.get(row['stage'], row['stage']))
+                        if row['total']:
+                            bar.config(mode='determinate', value=row['done'] * 100 / row['total'])
+                            detail_label.config(text=f"{format_bytes(row['done'])}/{format_bytes(row['total'])}")
+                        else:
+                            bar.config(mode='determinate', value=0)
+                            detail_label.config(text="")
+                        for col, widget in enumerate((name_label, stage_label, bar, detail_label)):
+                            widget.grid(row=i, column=col, sticky=tk.W, padx=2)
+                    else:
+                        for widget in (name_label, stage_label, bar, detail_label):
+                            widget.grid_remove()
+                
+                self.progress_summary.config(text=format_progress_summary(snapshot))
+        finally:
+            self.root.after(200, self._refresh_progress)
+    
+    def run_async(self, func, *args):
+        """在后台线程执行耗时操作，界面保持响应
+        
+        Returns:
+            bool: 是否已启动（已有任务在执行时返回 False）
+        """
+        if self.busy:
+            messagebox.showwarning("提示", "请等待当前操作完成")
+            return False
+        
+        self.busy = True
+        
+        def worker():
+            try:
+                func(*args)
+            except Exception as e:
+                self.log(f"[错误] {e}")
+            finally:
+                self.call_in_ui(setattr, self, 'busy', False)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        return True
     
     def on_source_changed(self, event):
         """源账号选择变化"""
@@ -211,15 +384,21 @@ class MigrateGUI:
             return
         
         self.log(f"正在登录源账号: {username}...")
-        self.source_migrator = FlowMigrator()
-        
-        if self.source_migrator.login(username, password):
-            self.source_status.config(text="已登录 ✓", foreground="green")
+        self.run_async(self._login_source_worker, username, password)
+    
+    def _login_source_worker(self, username, password):
+        migrator = FlowMigrator()
+        
+        if migrator.login(username, password):
+            self.source_migrator = migrator
+            # 换了源账号，之前账号的云端列表不再显示
+            self.cloud_flows = []
+            self.call_in_ui(lambda: self.source_status.config(text="已登录 ✓", foreground="green"))
             self.log(f"源账号登录成功: {username}")
         else:
-            self.source_status.config(text="登录失败", foreground="red")
-            self.log(f"源账号登录失败")
             self.source_migrator = None
+            self.call_in_ui(lambda: self.source_status.config(text="登录失败", foreground="red"))
+            self.log(f"源账号登录失败")
     
     def login_target(self):
         """登录目标账号"""
@@ -231,15 +410,19 @@ class MigrateGUI:
             return
         
         self.log(f"正在登录目标账号: {username}...")
-        self.target_migrator = FlowMigrator()
+        self.run_async(self._login_target_worker, username, password)
+    
+    def _login_target_worker(self, username, password):
+        migrator = FlowMigrator()
         
-        if self.target_migrator.login(username, password):
-            self.target_status.config(text="已登录 ✓", foreground="green")
+        if migrator.login(username, password):
+            self.target_migrator = migrator
+            self.call_in_ui(lambda: self.target_status.config(text="已登录 ✓", foreground="green"))
             self.log(f"目标账号登录成功: {username}")
         else:
-            self.target_status.config(text="登录失败", foreground="red")
-            self.log(f"目标账号登录失败")
             self.target_migrator = None
+            self.call_in_ui(lambda: self.target_status.config(text="登录失败", foreground="red"))
+            self.log(f"目标账号登录失败")
     
     def show_local_flows(self):
         """显示本地流程"""
@@ -255,6 +438,10 @@ class MigrateGUI:
         
         self.current_view = "cloud"
         self.view_label.config(text="当前: 云端流程(源账号)")
+        # 先显示磁盘缓存的目录，后台增量刷新后再更新
+        if not self.cloud_flows:
+            self.cloud_flows = catalog_cache.cached_apps(self.source_migrator) or []
+        self.display_flows(self.cloud_flows, is_local=False)
         self.refresh_cloud_flows()
     
     def refresh_current_view(self):
@@ -277,16 +464,40 @@ class MigrateGUI:
             return
         
         self.log("正在获取云端流程...")
-        self.cloud_flows = self.source_migrator.get_cloud_flow_list()
-        self.display_flows(self.cloud_flows, is_local=False)
-        self.log(f"找到 {len(self.cloud_flows)} 个云端流程")
+        self.run_async(self._refresh_cloud_worker)
+    
+    def _refresh_cloud_worker(self):
+        flows = catalog_cache.refresh(self.source_migrator)
+        self.call_in_ui(self._show_cloud_result, flows)
+        self.log(f"找到 {len(flows)} 个云端流程")
+    
+    def search_cloud_flows(self):
+        """按搜索框中的名称在服务端搜索云端流程（刷新按钮恢复完整列表）"""
+        query = self.search_var.get().strip()
+        if self.current_view != "cloud" or not self.source_migrator or not query or ':' in query:
+            return
+        
+        self.log(f"正在云端搜索: {query}...")
+        self.run_async(self._search_cloud_worker, query)
+    
+    def _search_cloud_worker(self, query):
+        flows = self.source_migrator.get_cloud_flow_list(name=query)
+        self.call_in_ui(self._show_cloud_result, flows)
+        self.log(f"云端搜索 \"{query}\": 找到 {len(flows)} 个流程")
+    
+    def _show_cloud_result(self, flows):
+        self.cloud_flows = flows
+        if self.current_view == "cloud":
+            self.display_flows(self.cloud_flows, is_local=False)
     
     def display_flows(self, flows, is_local=True):
         """显示流程到列表"""
-        # 清空列表
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # 清空列表（包括被搜索过滤暂时脱离列表的行，否则重新插入时 iid 冲突）
+        if self.search_index is not None:
+            self.tree.set_children('', *[str(i) for i in range(len(self.search_index))])
+        self.tree.delete(*self.tree.get_children())
         self.selected_items.clear()
+        self.search_index = FlowSearchIndex(flows)
         
         for i, flow in enumerate(flows):
             if is_local:
@@ -299,6 +510,26 @@ class MigrateGUI:
                 user = ''
             
             self.tree.insert('', 'end', iid=str(i), values=('☐', name, time, user))
+        
+        self.apply_filter()
+    
+    def apply_filter(self):
+        """按搜索框内容过滤列表
+        
+        所有行只插入一次，过滤时用 set_children 一次性替换可见行，
+        隐藏的行只是暂时脱离列表，已勾选状态保留。
+        """
+        if self.search_index is None:
+            return
+        
+        query = self.search_var.get()
+        matched = self.search_index.search(query)
+        self.tree.set_children('', *[str(i) for i in matched])
+        
+        if query.strip():
+            self.match_label.config(text=f"匹配 {len(matched)}/{len(self.search_index)}")
+        else:
+            self.match_label.config(text="")
     
     def on_tree_click(self, event):
         """点击列表项"""
@@ -317,26 +548,43 @@ class MigrateGUI:
                     values = list(self.tree.item(item, 'values'))
                     values[0] = '☑'
                     self.tree.item(item, values=values)
+                    self.prefetch_selected([item])
     
     def select_all(self):
-        """全选"""
+        """全选（只作用于当前搜索结果）"""
         for item in self.tree.get_children():
             self.selected_items.add(item)
             values = list(self.tree.item(item, 'values'))
             values[0] = '☑'
             self.tree.item(item, values=values)
+        self.prefetch_selected(self.tree.get_children())
+    
+    def prefetch_selected(self, items):
+        """云端视图中勾选流程时，在后台预取其详情（下载地址），迁移时可以立即开始下载"""
+        if self.current_view != "cloud" or not self.source_migrator:
+            return
+        self.source_migrator.prefetch_details([self.cloud_flows[int(i)].get('appId') for i in items])
     
     def deselect_all(self):
-        """取消全选"""
+        """取消全选（只作用于当前搜索结果）"""
         for item in self.tree.get_children():
             self.selected_items.discard(item)
             values = list(self.tree.item(item, 'values'))
             values[0] = '☐'
             self.tree.item(item, values=values)
     
+    def visible_selection(self):
+        """当前搜索结果中已勾选的行（被搜索隐藏的勾选不参与迁移/删除）"""
+        visible = [item for item in self.tree.get_children() if item in self.selected_items]
+        hidden = len(self.selected_items) - len(visible)
+        if hidden:
+            self.log(f"[提示] 另有 {hidden} 个已勾选的流程被搜索隐藏，不包含在本次操作中")
+        return visible
+    
     def do_migrate(self):
         """执行迁移"""
-        if not self.selected_items:
+        items = self.visible_selection()
+        if not items:
             messagebox.showwarning("提示", "请先选择要迁移的流程")
             return
         
@@ -346,18 +594,36 @@ class MigrateGUI:
         
         # 获取选中的流程
         if self.current_view == "local":
-            selected = [self.local_flows[int(i)] for i in self.selected_items]
-            self.migrate_local_flows(selected)
+            selected = [self.local_flows[int(i)] for i in items]
+            self.run_async(self.migrate_local_flows, selected)
         else:
             if not self.source_migrator:
                 messagebox.showwarning("提示", "请先登录源账号")
                 return
-            selected = [self.cloud_flows[int(i)] for i in self.selected_items]
-            self.migrate_cloud_flows(selected)
+            selected = [self.cloud_flows[int(i)] for i in items]
+            self.run_async(self.migrate_cloud_flows, selected)
+    
+    def begin_job(self, source, flow_ids):
+        """为本批迁移打开任务账本（上次中断的同类任务中有本批流程未完成时继续该任务）"""
+        job = self.ledger.resume_or_create('migrate', source, self.target_migrator.account, flow_ids)
+        if job.summary():
+            self.log(f"继续未完成的任务 {job.job_id}")
+        self.target_migrator.job = job
+        return job
+    
+    def end_job(self, job, all_ok):
+        """全部成功时结束任务；有失败的流程时保留任务，下次迁移同类流程时从断点继续"""
+        if all_ok:
+            job.finish()
+        else:
+            self.log(f"[提示] 任务 {job.job_id} 未全部完成，再次迁移时将从断点继续")
     
     def migrate_local_flows(self, flows):
         """迁移本地流程"""
         self.log(f"开始迁移 {len(flows)} 个本地流程...")
+        self.target_migrator.progress_callback = self.start_progress(
+            [(flow['app_id'], flow['name']) for flow in flows])
+        job = self.begin_job('local', [flow['app_id'] for flow in flows])
         success = 0
         for flow in flows:
             self.log(f"正在迁移: {flow['name']}")
@@ -366,25 +632,31 @@ class MigrateGUI:
                 self.log(f"  ✓ 迁移成功")
             else:
                 self.log(f"  ✗ 迁移失败")
+        self.end_job(job, success == len(flows))
         
         self.log(f"迁移完成: 成功 {success}/{len(flows)}")
-        messagebox.showinfo("完成", f"迁移完成: 成功 {success}/{len(flows)} 个流程")
+        self.call_in_ui(messagebox.showinfo, "完成", f"迁移完成: 成功 {success}/{len(flows)} 个流程")
     
     def migrate_cloud_flows(self, flows):
         """迁移云端流程"""
         self.log(f"开始迁移 {len(flows)} 个云端流程...")
-        success = 0
-        for flow in flows:
-            name = flow.get('appName', '未知')
-            self.log(f"正在迁移: {name}")
-            if self.target_migrator.migrate_from_cloud(flow, self.source_migrator):
-                success += 1
-                self.log(f"  ✓ 迁移成功")
+        self.target_migrator.progress_callback = self.start_progress(
+            [(flow.get('appId'), flow.get('appName', '未知')) for flow in flows])
+        job = self.begin_job('cloud', [flow.get('appId') for flow in flows])
+        
+        # 下载、重新打包、上传在流水线中重叠进行，结果按完成顺序输出
+        def on_result(result):
+            if result['status'] == 'ok':
+                self.log(f"  ✓ 迁移成功: {result['name']}")
             else:
-                self.log(f"  ✗ 迁移失败")
+                self.log(f"  ✗ 迁移失败: {result['name']}")
+        
+        results = migrate_cloud_pipeline(flows, self.source_migrator, self.target_migrator, on_result=on_result)
+        success = sum(1 for result in results if result['status'] == 'ok')
+        self.end_job(job, success == len(flows))
         
         self.log(f"云端迁移完成: 成功 {success}/{len(flows)}")
-        messagebox.showinfo("完成", f"云端迁移完成: 成功 {success}/{len(flows)} 个流程")
+        self.call_in_ui(messagebox.showinfo, "完成", f"云端迁移完成: 成功 {success}/{len(flows)} 个流程")
     
     def do_delete(self):
         """删除本地流程"""
@@ -392,15 +664,19 @@ class MigrateGUI:
             messagebox.showwarning("提示", "只能删除本地流程")
             return
         
-        if not self.selected_items:
+        items = self.visible_selection()
+        if not items:
             messagebox.showwarning("提示", "请先选择要删除的流程")
             return
         
-        selected = [self.local_flows[int(i)] for i in self.selected_items]
+        selected = [self.local_flows[int(i)] for i in items]
         
         if not messagebox.askyesno("确认删除", f"确定要删除 {len(selected)} 个流程吗？\n此操作不可恢复！"):
             return
         
+        self.run_async(self._delete_worker, selected)
+    
+    def _delete_worker(self, selected):
         self.log(f"开始删除 {len(selected)} 个流程...")
         success = 0
         for flow in selected:
@@ -411,8 +687,8 @@ class MigrateGUI:
                 self.log(f"  ✗ 删除失败: {flow['name']}")
         
         self.log(f"删除完成: 成功 {success}/{len(selected)}")
-        self.refresh_local_flows()
-        messagebox.showinfo("完成", f"删除完成: 成功 {success}/{len(selected)} 个流程")
+        self.call_in_ui(self.refresh_local_flows)
+        self.call_in_ui(messagebox.showinfo, "完成", f"删除完成: 成功 {success}/{len(selected)} 个流程")
 
 
 def main():
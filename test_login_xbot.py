@@ -3,9 +3,11 @@
 """
 影刀 Web 登录测试
 """
-import requests
 import base64
 
+# HTTP 传输层：与 migrate_flow 相同，设置 YINGDAO_CASSETTE 时录制/回放（见 flow_transport.py）
+from flow_transport import transport
+
 # RSA 公钥 (从 xbot 软件提取 - 用于 crypt=metal)
 RSA_PUBLIC_KEY = """-----BEGIN PUBLIC KEY-----
 MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQCte0XfPY9GUpQ3ZasH1kVbDhRw
@@ -63,7 +65,7 @@ def web_login(username, password):
     }
     
     # xbot 软件使用 /oauth/token (不是 /oauth/token/v2)
-    response = requests.post(
+    response = transport.post(
         "https://api.yingdao.com/oauth/token", 
         headers=headers, 
         data=data,  # 使用 data= 发送表单数据
@@ -133,7 +135,7 @@ def get_app_list(access_token):
             "sortBy": "4"
         }
         
-        response = requests.post(url, headers=headers, json=payload, verify=False)
+        response = transport.post(url, headers=headers, json=payload, verify=False)
         
         try:
             result = response.json()
@@ -0,0 +1,50 @@
+# -*- coding:utf-8 -*-
+"""测试公共设置：模块在仓库根目录，网络请求都发往本地模拟服务 (fake_server.py)"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_server import FakeYingdaoServer
+
+
+@pytest.fixture
+def server():
+    with FakeYingdaoServer() as fake:
+        yield fake
+
+
+@pytest.fixture
+def login(server):
+    """login(账号) -> 已登录模拟服务的 FlowMigrator"""
+    import migrate_flow
+
+    def _login(account):
+        migrator = migrate_flow.FlowMigrator(base_url=server.url, auth_url=server.url)
+        assert migrator.login(account, 'password')
+        return migrator
+    return _login
+
+
+@pytest.fixture
+def cli(server, tmp_path, monkeypatch, capsys):
+    """cli(参数...) -> (退出码, 结果 JSON)；源账号 src、目标账号 dst，账本和目录缓存在临时目录"""
+    import migrate_flow
+    from flow_catalog import catalog_cache
+    monkeypatch.setattr(catalog_cache, 'cache_dir', str(tmp_path / 'catalog'))
+    monkeypatch.setenv('YINGDAO_BASE_URL', server.url)
+    monkeypatch.setenv('YINGDAO_AUTH_URL', server.url)
+    for role, account in (('SOURCE', 'src'), ('TARGET', 'dst')):
+        monkeypatch.setenv(f'YINGDAO_{role}_USERNAME', account)
+        monkeypatch.setenv(f'YINGDAO_{role}_PASSWORD', 'password')
+    ledger = str(tmp_path / 'ledger.db')
+
+    def _cli(*argv):
+        capsys.readouterr()
+        code = migrate_flow.run_cli(['--log-level', 'error', '--ledger', ledger, *argv])
+        return code, json.loads(capsys.readouterr().out)
+    _cli.ledger = ledger
+    return _cli
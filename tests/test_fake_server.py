@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+import io
+import zipfile
+
+import requests
+
+from fake_server import parse_size
+
+
+def test_parse_size():
+    assert parse_size('512KB') == 512 * 1024
+    assert parse_size('2MB') == 2 * 1024 * 1024
+    assert parse_size(None) is None
+
+
+def test_login_and_paged_listing(server, login):
+    for i in range(35):
+        server.add_app('src', f'流程{i}')
+    migrator = login('src')
+    apps = migrator.get_cloud_flow_list()
+    assert len(apps) == 35
+    assert {app['appName'] for app in apps} == {f'流程{i}' for i in range(35)}
+    result = migrator.get_cloud_flow_page(2)
+    assert result is not None
+    app_list, page_info = result
+    assert (len(app_list), page_info['pages'], page_info['total']) == (5, 2, 35)
+
+
+def test_double_json_login(server, login):
+    server.set_faults(double_json=1.0)
+    assert login('src').access_token
+
+
+def test_presigned_url_is_verified(server):
+    server.add_app('src', '流程')
+    key = next(iter(server.objects))
+    assert requests.get(server.presign('GET', key, 60)).status_code == 200
+    assert requests.get(server.presign('GET', key, -1)).status_code == 403
+    tampered = server.presign('GET', key, 60).replace('Signature=', 'Signature=x')
+    assert requests.get(tampered).status_code == 403
+
+
+def test_cloud_migration_round_trip(server, login):
+    server.add_app('src', '流程')
+    source, target = login('src'), login('dst')
+    flow = source.get_cloud_flow_list()[0]
+    assert target.migrate_from_cloud(flow, source)
+
+    created = list(server.apps['dst'].values())
+    assert len(created) == 1
+    assert created[0]['appName'].startswith('流程_云迁_接收于')
+    bot = server.objects[created[0]['packageKey']]
+    with zipfile.ZipFile(io.BytesIO(bot)) as zf:
+        assert 'package.json' in zf.namelist()
+    assert server.orphan_bytes() == 0
+
+
+def test_recycle(server, login):
+    app_id = server.add_app('src', '流程')
+    migrator = login('src')
+    assert migrator.delete_cloud_flow(app_id)
+    assert migrator.get_cloud_flow_list() == []
@@ -0,0 +1,120 @@
+# -*- coding:utf-8 -*-
+import pytest
+
+from flow_catalog import CatalogCache
+
+
+class FakeMigrator:
+    """按更新时间从新到旧分页返回 apps，可让某一页失败"""
+
+    account = 'user'
+    base_url = 'http://api'
+
+    def __init__(self, apps, page_size=2, fail_page=None):
+        self.apps = apps
+        self.page_size = page_size
+        self.fail_page = fail_page
+        self.pages = []
+
+    def get_cloud_flow_page(self, page):
+        self.pages.append(page)
+        if page == self.fail_page:
+            return None
+        pages = max(1, -(-len(self.apps) // self.page_size))
+        start = (page - 1) * self.page_size
+        return self.apps[start:start + self.page_size], {'pages': pages, 'total': len(self.apps)}
+
+
+def apps(*specs):
+    return [{'appId': app_id, 'updateTime': update_time} for app_id, update_time in specs]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CatalogCache(str(tmp_path))
+
+
+def test_full_refresh_saves(cache):
+    migrator = FakeMigrator(apps(('e', 5), ('d', 4), ('c', 3), ('b', 2), ('a', 1)))
+    assert [app['appId'] for app in cache.refresh(migrator)] == ['e', 'd', 'c', 'b', 'a']
+    assert migrator.pages == [1, 2, 3]
+    assert cache.cached_apps(migrator) == migrator.apps
+
+
+def test_incremental_refresh_stops_at_known(cache):
+    migrator = FakeMigrator(apps(('e', 5), ('d', 4), ('c', 3), ('b', 2), ('a', 1)))
+    cache.refresh(migrator)
+    # c 被修改（移到最前），新增 f
+    migrator.apps = apps(('c', 7), ('f', 6), ('e', 5), ('d', 4), ('b', 2), ('a', 1))
+    migrator.pages = []
+    result = cache.refresh(migrator)
+    assert migrator.pages == [1, 2]
+    assert [app['appId'] for app in result] == ['c', 'f', 'e', 'd', 'b', 'a']
+    assert result[0]['updateTime'] == 7
+
+
+def test_deletion_falls_back_to_full_refresh(cache):
+    migrator = FakeMigrator(apps(('c', 3), ('b', 2), ('a', 1)))
+    cache.refresh(migrator)
+    migrator.apps = apps(('c', 3), ('a', 1))
+    migrator.pages = []
+    assert [app['appId'] for app in cache.refresh(migrator)] == ['c', 'a']
+    assert migrator.pages == [1, 1]
+
+
+def test_failed_page_is_not_saved(cache):
+    migrator = FakeMigrator(apps(('c', 3), ('b', 2), ('a', 1)), fail_page=2)
+    assert len(cache.refresh(migrator)) == 2
+    assert cache.load(migrator) is None
+
+    migrator.fail_page = None
+    cache.refresh(migrator)
+    migrator.apps = apps(('d', 4), ('c', 3), ('b', 2), ('a', 1))
+    migrator.fail_page = 2
+    # 增量刷新在第 1 页遇到已知流程即停止，不受第 2 页影响
+    assert len(cache.refresh(migrator)) == 4
+    # 完整刷新失败时保留原有缓存
+    cache.refresh(migrator, full=True)
+    assert len(cache.cached_apps(migrator)) == 4
+
+
+def test_get_uses_ttl(cache):
+    migrator = FakeMigrator(apps(('b', 2), ('a', 1)))
+    cache.get(migrator)
+    migrator.pages = []
+    assert len(cache.get(migrator)) == 2
+    assert migrator.pages == []
+    cache.get(migrator, max_age=0)
+    assert migrator.pages == [1]
+
+
+def test_remove_and_account_isolation(cache):
+    migrator = FakeMigrator(apps(('b', 2), ('a', 1)))
+    cache.refresh(migrator)
+    fetched = cache.load(migrator)['fetched']
+    cache.remove(migrator, ['a'])
+    assert [app['appId'] for app in cache.cached_apps(migrator)] == ['b']
+    assert cache.load(migrator)['fetched'] == fetched
+
+    other = FakeMigrator([])
+    other.account = 'other'
+    assert cache.cached_apps(other) is None
+    other.account, other.base_url = 'user', 'http://elsewhere'
+    assert cache.load(other) is None
+
+
+def test_cli_delete_updates_cache(server, cli, tmp_path):
+    import json
+    from flow_catalog import catalog_cache
+    import migrate_flow
+    for i in range(3):
+        server.add_app('src', f'流程{i}')
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps(['流程1']), encoding='utf-8')
+
+    migrator = migrate_flow.FlowMigrator(base_url=server.url, auth_url=server.url)
+    migrator.login('src', 'password')
+    assert len(catalog_cache.refresh(migrator)) == 3
+    code, result = cli('delete', 'cloud', '--manifest', str(manifest), '--yes')
+    assert (code, result['succeeded']) == (0, 1)
+    assert sorted(app['appName'] for app in catalog_cache.get(migrator)) == ['流程0', '流程2']
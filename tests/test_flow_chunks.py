@@ -0,0 +1,116 @@
+# -*- coding:utf-8 -*-
+import io
+import os
+import random
+import zipfile
+import threading
+
+import pytest
+
+import flow_chunks
+from flow_chunks import ChunkStore, chunk_boundaries, MIN_CHUNK, MAX_CHUNK
+
+
+def make_bot(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def read_bot(bot_data):
+    with zipfile.ZipFile(io.BytesIO(bot_data)) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.fixture
+def data():
+    return random.Random(7).randbytes(600 * 1024)
+
+
+def test_boundaries_cover_input(data):
+    boundaries = chunk_boundaries(data)
+    assert boundaries[-1] == len(data)
+    sizes = [end - start for start, end in zip([0] + boundaries, boundaries)]
+    assert all(size <= MAX_CHUNK for size in sizes)
+    assert all(size >= MIN_CHUNK for size in sizes[:-1])
+    assert chunk_boundaries(b'') == []
+    assert chunk_boundaries(b'x' * 100) == [100]
+
+
+def test_boundaries_are_content_defined(data):
+    # 开头插入内容只影响附近的块，之后的切点随之平移
+    inserted = b'inserted' + data
+    shifted = {end - len(b'inserted') for end in chunk_boundaries(inserted)}
+    assert len(shifted & set(chunk_boundaries(data))) >= len(chunk_boundaries(data)) - 2
+
+
+def test_pure_python_matches_vectorised(data, monkeypatch):
+    if flow_chunks.numpy is None:
+        pytest.skip('numpy 未安装')
+    vectorised = chunk_boundaries(data)
+    monkeypatch.setattr(flow_chunks, 'numpy', None)
+    assert chunk_boundaries(data) == vectorised
+
+
+def test_bot_round_trip_and_dedup(tmp_path, data):
+    store = ChunkStore(str(tmp_path / 'store'))
+    files = {'package.json': b'{"name": "a"}', 'main.py': data, 'res/empty.txt': b''}
+    first = store.add_bot(make_bot(files), 'first')
+    second = store.add_bot(make_bot(dict(files, **{'package.json': b'{"name": "b"}'})), 'second')
+
+    assert read_bot(store.restore_bot(first)) == files
+    assert read_bot(store.restore_bot(second))['package.json'] == b'{"name": "b"}'
+    stats = store.stats()
+    assert stats['snapshots'] == 2
+    assert stats['dedup_ratio'] > 1.9
+    # 同一秒内创建的快照顺序不确定
+    assert sorted(snapshot['label'] for snapshot in store.snapshots()) == ['first', 'second']
+
+
+def test_directory_round_trip(tmp_path, data):
+    robot = tmp_path / 'xbot_robot'
+    (robot / 'sub').mkdir(parents=True)
+    (robot / 'main.py').write_bytes(data)
+    (robot / 'sub' / 'package.json').write_bytes(b'{}')
+    store = ChunkStore(str(tmp_path / 'store'))
+    snapshot_id = store.add_directory(str(robot))
+
+    restored = tmp_path / 'restored'
+    store.restore_directory(snapshot_id, str(restored))
+    assert (restored / 'main.py').read_bytes() == data
+    assert (restored / 'sub' / 'package.json').read_bytes() == b'{}'
+
+
+def test_corrupted_chunk_detected(tmp_path, data):
+    store = ChunkStore(str(tmp_path / 'store'))
+    snapshot_id = store.add_bot(make_bot({'main.py': data}))
+    digest = store.get_snapshot(snapshot_id)['members'][0]['chunks'][0][0]
+    flow_chunks._write_atomic(store._chunk_path(digest), flow_chunks.zlib.compress(b'garbage'))
+    with pytest.raises(ValueError):
+        store.restore_bot(snapshot_id)
+
+
+def test_unknown_snapshot(tmp_path):
+    with pytest.raises(KeyError):
+        ChunkStore(str(tmp_path)).get_snapshot('missing')
+
+
+def test_concurrent_writes_of_same_chunk(tmp_path):
+    path = str(tmp_path / 'ab' / 'chunk')
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                flow_chunks._write_atomic(path, b'same content')
+        except OSError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(os.path.dirname(path)) == ['chunk']
@@ -0,0 +1,74 @@
+# -*- coding:utf-8 -*-
+import sqlite3
+
+import pytest
+
+from flow_ledger import JobLedger, read_sync_records, stage_reached
+
+
+@pytest.fixture
+def ledger():
+    ledger = JobLedger(':memory:')
+    yield ledger
+    ledger.close()
+
+
+def test_stages_and_summary(ledger):
+    job = ledger.create_job('migrate', 'local', 'dst')
+    job.prepare('a', '流程', 'new-a', '流程_副本', {'uuid': 'new-a'})
+    assert stage_reached(job.get('a'), 'prepared') and not stage_reached(job.get('a'), 'uploaded_bot')
+    job.advance('a', 'uploaded_bot', expires=200)
+    job.advance('a', 'uploaded_json', 'md5', expires=100)
+    entry = job.get('a')
+    assert (entry['stage'], entry['file_key_md5'], entry['expires']) == ('uploaded_json', 'md5', 100)
+    assert entry['package_data'] == {'uuid': 'new-a'}
+    assert job.summary() == {'uploaded_json': 1}
+    with pytest.raises(ValueError):
+        job.advance('a', 'unknown')
+
+
+def test_resume_only_with_unfinished_overlap(ledger):
+    job = ledger.create_job('migrate', 'local', 'dst')
+    for flow_id in ('a', 'b'):
+        job.prepare(flow_id, flow_id, f'new-{flow_id}', flow_id, {})
+    job.advance('a', 'created')
+
+    assert ledger.resume_or_create('migrate', 'local', 'dst', ['b', 'c']).job_id == job.job_id
+    # 只重新迁移旧任务中已完成的流程时新建任务
+    assert ledger.resume_or_create('migrate', 'local', 'dst', ['a']).job_id != job.job_id
+    assert ledger.resume_or_create('migrate', 'local', 'other', ['b']).job_id != job.job_id
+    job.finish()
+    assert ledger.resume_or_create('migrate', 'local', 'dst', ['b']).job_id != job.job_id
+
+
+def test_open_job_by_id(ledger):
+    job = ledger.open_job('J1', 'migrate', 'local', 'dst')
+    job.finish()
+    assert ledger.open_job('J1').job_id == 'J1'
+    assert ledger.get_job('J1')['status'] == 'running'
+
+
+def test_old_ledger_gets_new_columns(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        'CREATE TABLE job_flows (job_id TEXT NOT NULL, flow_id TEXT NOT NULL, name TEXT, stage TEXT NOT NULL, '
+        'new_app_id TEXT NOT NULL, new_name TEXT NOT NULL, package_data TEXT NOT NULL, file_key_md5 TEXT, '
+        'updated TEXT NOT NULL, PRIMARY KEY (job_id, flow_id));'
+        'CREATE TABLE sync_map (source TEXT NOT NULL, target TEXT NOT NULL, source_id TEXT NOT NULL, version TEXT, '
+        'target_app_id TEXT NOT NULL, name TEXT, updated TEXT NOT NULL, PRIMARY KEY (source, target, source_id));'
+        "INSERT INTO sync_map VALUES ('local', 'dst', 'a', 'v1', 't1', '流程', '2026-01-01 00:00:00');")
+    conn.close()
+
+    assert read_sync_records(path, 'local', 'dst')['a']['stat'] is None
+    ledger = JobLedger(path)
+    ledger.record_sync('local', 'dst', 'b', 'v2', 't2', stat='s2')
+    records = ledger.sync_records('local', 'dst')
+    assert (records['a']['version'], records['b']['stat']) == ('v1', 's2')
+    ledger.close()
+
+
+def test_read_sync_records_does_not_create(tmp_path):
+    path = tmp_path / 'missing.db'
+    assert read_sync_records(str(path), 'local', 'dst') == {}
+    assert not path.exists()
@@ -0,0 +1,94 @@
+# -*- coding:utf-8 -*-
+import time
+import threading
+
+import pytest
+
+from flow_pipeline import Stage, run_pipeline
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+
+def test_all_stages_in_order():
+    done = []
+    lock = threading.Lock()
+
+    def on_done(state):
+        with lock:
+            done.append(state['i'])
+
+    def add(key):
+        def stage(state):
+            state.setdefault('trail', []).append(key)
+            return True
+        return stage
+    items = [{'i': i} for i in range(20)]
+    stages = [Stage('download', add('d'), 3), Stage('repack', add('r'), 2), Stage('upload', add('u'), 3)]
+    assert run_pipeline(items, stages, queue_size=1, on_done=on_done) is items
+    assert sorted(done) == list(range(20))
+    assert all(item['trail'] == ['d', 'r', 'u'] and item['stage'] == 'upload' for item in items)
+    assert pipeline_threads() == []
+
+
+def test_stage_false_or_error_ends_item():
+    def first(state):
+        if state['i'] == 1:
+            raise ValueError('boom')
+        return state['i'] != 2
+
+    items = [{'i': i} for i in range(4)]
+    run_pipeline(items, [Stage('first', first), Stage('second', lambda state: True)])
+    assert [item['stage'] for item in items] == ['second', 'first', 'first', 'second']
+    assert items[1]['error'] == 'boom'
+
+
+def test_on_done_error_stops_pipeline():
+    def on_done(state):
+        if state['i'] == 3:
+            raise RuntimeError('callback failed')
+
+    items = [{'i': i} for i in range(200)]
+    with pytest.raises(RuntimeError):
+        run_pipeline(items, [Stage('a', lambda state: True, 2), Stage('b', lambda state: True)], 1, on_done)
+    assert pipeline_threads() == []
+
+
+def test_base_exception_in_stage_stops_pipeline():
+    processed = []
+
+    def stage(state):
+        if state['i'] == 2:
+            raise KeyboardInterrupt
+        processed.append(state['i'])
+        return True
+
+    items = [{'i': i} for i in range(100)]
+    with pytest.raises(KeyboardInterrupt):
+        run_pipeline(items, [Stage('a', stage), Stage('b', lambda state: time.sleep(0.01) or True)], 1)
+    assert pipeline_threads() == []
+    assert len(processed) < 100
+
+
+def test_ctrl_c_in_main_thread_stops_workers():
+    import _thread
+    started = threading.Event()
+    processed = []
+
+    def slow(state):
+        started.set()
+        time.sleep(0.05)
+        processed.append(state['i'])
+        return True
+
+    def interrupt():
+        started.wait(5)
+        _thread.interrupt_main()
+    threading.Thread(target=interrupt).start()
+    with pytest.raises(KeyboardInterrupt):
+        run_pipeline([{'i': i} for i in range(100)], [Stage('slow', slow, 2), Stage('b', lambda state: True)], 1)
+    assert pipeline_threads() == []
+    count = len(processed)
+    time.sleep(0.2)
+    assert len(processed) == count < 100
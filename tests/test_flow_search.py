@@ -0,0 +1,70 @@
+# -*- coding:utf-8 -*-
+import pytest
+
+import flow_search
+from flow_search import FlowSearchIndex
+
+
+FLOWS = [
+    {'name': '每日报表', 'app_id': 'a1', 'user_id': '100', 'update_time': '2026-02-01 10:00:00'},
+    {'appName': '报表汇总', 'appId': 'b2', 'versionStatus': 'p', 'updateTime': '2026-03-05 08:00:00'},
+    {'name': 'report sync', 'app_id': 'c3', 'user_id': '200', 'update_time': '2025-12-31 23:00:00'},
+]
+
+
+def test_empty_query_returns_all():
+    assert FlowSearchIndex(FLOWS).search('') == [0, 1, 2]
+
+
+def test_substring_and_prefix_first():
+    index = FlowSearchIndex(FLOWS)
+    # 两个都包含 "报表"，名称以其开头的排在前面
+    assert index.search('报表') == [1, 0]
+
+
+def test_all_terms_must_match():
+    index = FlowSearchIndex(FLOWS)
+    assert index.search('report sync') == [2]
+    assert index.search('report missing') == []
+
+
+def test_field_filters():
+    index = FlowSearchIndex(FLOWS)
+    assert index.search('status:p') == [1]
+    assert index.search('user:200') == [2]
+    assert index.search('time:2026-02') == [0]
+    assert index.search('id:b2') == [1]
+
+
+def test_narrowing_reuses_previous_result():
+    index = FlowSearchIndex(FLOWS)
+    assert index.search('re') == [2]
+    assert index.search('rep') == [2]
+    # 放宽条件后重新在全部流程中搜索
+    assert index.search('报') == [1, 0]
+
+
+def test_filter_returns_flows():
+    assert FlowSearchIndex(FLOWS).filter('sync') == [FLOWS[2]]
+
+
+def test_pinyin_match():
+    pytest.importorskip('pypinyin')
+    index = FlowSearchIndex(FLOWS)
+    assert index.search('mrbb') == [0]
+    assert index.search('baobiao') == [0, 1]
+
+
+def test_missing_pypinyin_warns_once(monkeypatch):
+    from flow_events import events
+    records = []
+    sink = records.append
+    monkeypatch.setattr(flow_search, 'lazy_pinyin', None)
+    monkeypatch.setattr(flow_search, '_pinyin_warned', type(flow_search._pinyin_warned)())
+    events.add_sink(sink)
+    try:
+        FlowSearchIndex(FLOWS)
+        FlowSearchIndex(FLOWS)
+    finally:
+        events.remove_sink(sink)
+    assert [record['event'] for record in records].count('search') == 1
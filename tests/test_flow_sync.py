@@ -0,0 +1,75 @@
+# -*- coding:utf-8 -*-
+from flow_ledger import JobLedger
+from flow_sync import plan_sync, plan_summary, plan_rows, flow_version, original_name
+
+
+def app(app_id, name, version='v1', update_time='2026-01-01 00:00:00'):
+    return {'appId': app_id, 'appName': name, 'versionId': version, 'updateTime': update_time}
+
+
+def test_original_name():
+    assert original_name('报表_云迁_接收于2026年01月02日 03时04分05秒') == '报表'
+    assert original_name('报表') == '报表'
+
+
+def test_flow_version_tracks_unpublished_edits():
+    published = app('s1', '报表')
+    edited = dict(published, updateTime='2026-01-02 00:00:00')
+    assert flow_version(published) != flow_version(edited)
+
+
+def test_plan_actions():
+    source = [app('s1', '未变化'), app('s2', '已变化', 'v2'), app('s3', '目标已删除'),
+              app('s4', '同名'), app('s5', '新流程')]
+    target = [app('t1', '未变化_云迁_接收于2026年01月02日 03时04分05秒'), app('t2', '已变化'),
+              app('t4', '同名_云迁_接收于2026年01月02日 03时04分05秒')]
+    records = {
+        's1': {'version': flow_version(source[0]), 'target_app_id': 't1'},
+        's2': {'version': flow_version(app('s2', '已变化', 'v1')), 'target_app_id': 't2'},
+        's3': {'version': flow_version(source[2]), 'target_app_id': 't3'},
+    }
+    plan = plan_sync(source, target, records)
+    assert [entry['flow'] for entry in plan] == source
+    assert [(entry['action'], entry['target_app_id']) for entry in plan] == [
+        ('unchanged', 't1'), ('changed', 't2'), ('new', None), ('present', 't4'), ('new', None)]
+    assert plan_summary(plan) == {'new': 2, 'changed': 1, 'unchanged': 1, 'present': 1}
+    assert plan_rows(plan)[1] == {'id': 's2', 'name': '已变化', 'version': flow_version(source[1]),
+                                  'action': 'changed', 'target_app_id': 't2', 'reason': plan[1]['reason']}
+
+
+def test_plan_with_ledger_records():
+    ledger = JobLedger(':memory:')
+    source = [app('s1', '报表')]
+    ledger.record_sync('src', 'dst', 's1', flow_version(source[0]), 't1', '报表')
+    records = ledger.sync_records('src', 'dst')
+    assert plan_sync(source, [app('t1', '报表_副本')], records)[0]['action'] == 'unchanged'
+    assert plan_sync(source, [], records)[0]['action'] == 'new'
+    assert ledger.sync_records('src', 'other') == {}
+    ledger.close()
+
+
+def test_sync_cli(server, cli):
+    for i in range(3):
+        server.add_app('src', f'流程{i}')
+
+    code, result = cli('sync', '--dry-run')
+    assert (code, result['plan']['new'], len(server.apps.get('dst', {}))) == (0, 3, 0)
+
+    code, result = cli('sync')
+    assert (code, result['succeeded'], len(server.apps['dst'])) == (0, 3, 3)
+
+    code, result = cli('sync')
+    assert (result['plan']['unchanged'], result['succeeded']) == (3, 0)
+
+    # 只修改未发布：versionId 不变，updateTime 变化
+    edited = next(app for app in server.apps['src'].values() if app['appName'] == '流程1')
+    edited['updateTime'] = '2030-01-01 00:00:00'
+    code, result = cli('sync')
+    assert (result['plan']['changed'], result['succeeded']) == (1, 1)
+    assert [(row['name'], row['removed']) for row in result['stale']] == [('流程1', False)]
+    assert len(server.apps['dst']) == 4
+
+    edited['updateTime'] = '2030-01-02 00:00:00'
+    code, result = cli('sync', '--replace')
+    assert [(row['name'], row['removed']) for row in result['stale']] == [('流程1', True)]
+    assert len(server.apps['dst']) == 4
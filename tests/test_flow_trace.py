@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+import json
+import threading
+
+from flow_trace import Tracer, NOOP_SPAN, traced
+
+
+def test_disabled_tracer_returns_noop():
+    tracer = Tracer()
+    assert tracer.span('download') is NOOP_SPAN
+    with tracer.span('download') as span:
+        span.add(bytes=10)
+    assert tracer.spans == []
+
+
+def test_nested_spans_and_summary():
+    tracer = Tracer(enabled=True)
+    with tracer.span('migrate', flow='a'):
+        with tracer.span('upload_package_bot') as span:
+            span.add(bytes=100, retries=1)
+            span.add(bytes=50)
+            assert tracer.current() is span
+    summary = tracer.summary()
+    assert summary['migrate']['count'] == 1
+    assert summary['upload_package_bot']['bytes'] == 150
+    assert summary['upload_package_bot']['retries'] == 1
+    assert tracer.current() is NOOP_SPAN
+
+
+def test_span_fields_may_use_name_and_cat():
+    tracer = Tracer(enabled=True)
+    with tracer.span('migrate', name='流程', cat='field'):
+        pass
+    span = tracer.spans[0]
+    assert (span.name, span.cat) == ('migrate', 'migrate')
+    assert span.args == {'name': '流程', 'cat': 'field'}
+
+
+def test_exception_is_recorded():
+    tracer = Tracer(enabled=True)
+    try:
+        with tracer.span('create_app'):
+            raise ValueError('boom')
+    except ValueError:
+        pass
+    assert tracer.spans[0].args['error'] == 'ValueError'
+
+
+def test_chrome_trace_per_thread(tmp_path):
+    tracer = Tracer(enabled=True)
+
+    def work():
+        with tracer.span('download'):
+            pass
+    threads = [threading.Thread(target=work, name=f"worker-{n}") for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    path = tmp_path / 'trace.json'
+    tracer.export_chrome_trace(str(path))
+    trace = json.loads(path.read_text(encoding='utf-8'))
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    names = [event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M']
+    assert len(spans) == 2 and len({event['tid'] for event in spans}) == 2
+    assert sorted(names) == ['worker-0', 'worker-1']
+
+
+def test_traced_decorator():
+    class Client:
+        tracer = Tracer(enabled=True)
+
+        @traced('get_upload_url')
+        def get_upload_url(self):
+            return 'url'
+    client = Client()
+    assert client.get_upload_url() == 'url'
+    assert client.tracer.summary()['get_upload_url']['count'] == 1
@@ -0,0 +1,120 @@
+# -*- coding:utf-8 -*-
+import json
+import time
+import threading
+
+import pytest
+
+import migrate_flow
+from flow_transport import (request_key, account_alias, _redact_body, RecordingTransport, ReplayTransport,
+                            SingleFlightTransport, CassetteMiss, build_response)
+
+
+def test_key_ignores_presigned_params_and_uuids():
+    first = request_key('put', 'http://oss/robots/robot-0b6f6a4e-1111-2222-3333-444455556666/package.bot'
+                               '?Expires=1&Signature=a&OSSAccessKeyId=k')
+    second = request_key('PUT', 'http://oss/robots/robot-9c1d2e3f-aaaa-bbbb-cccc-ddddeeeeffff/package.bot'
+                                '?Signature=b&Expires=2')
+    assert first == second
+
+
+def test_key_includes_json_body_and_account():
+    url = 'http://api/api/client/app/file/assignUploadUrl'
+    bot = request_key('POST', url, json_body={'appId': '0b6f6a4e-1111-2222-3333-444455556666', 'isBot': 'true'})
+    json_file = request_key('POST', url, json_body={'appId': '0b6f6a4e-1111-2222-3333-444455556666', 'isBot': 'false'})
+    assert bot != json_file
+
+    def page(number, account):
+        return request_key('POST', 'http://api/api/client/app/develop/list', json_body={'pageDTO': {'page': number}},
+                           account=account)
+    assert page(1, 'a') != page(2, 'a')
+    assert page(1, 'a') != page(1, 'b')
+
+
+def test_key_ignores_volatile_body_fields():
+    url = 'http://api/api/client/app/develop/create'
+    first = request_key('POST', url, json_body={'name': '流程_云迁_接收于2026年01月02日 03时04分05秒', 'packageMd5': 'a'})
+    second = request_key('POST', url, json_body={'name': '流程_云迁_接收于2026年10月19日 10时19分10秒', 'packageMd5': 'b'})
+    assert first == second
+
+
+def test_key_drops_password():
+    url = 'http://auth/oauth/token'
+    assert (request_key('POST', url, form={'username': 'u', 'password': 'x'})
+            == request_key('POST', url, form={'username': 'u', 'password': 'y'}))
+    assert (request_key('POST', url, form={'username': 'u', 'password': 'x'})
+            != request_key('POST', url, form={'username': 'v', 'password': 'x'}))
+
+
+def test_redact_double_json_login():
+    body = b'{"access_token":"SECRET","success":true}{"code":0,"access_token": "SECRET"}'
+    redacted = _redact_body(body, account_alias('u'))
+    assert b'SECRET' not in redacted
+    assert redacted.count(account_alias('u').encode()) == 2
+    assert _redact_body(b'{"data":[]}') == b'{"data":[]}'
+
+
+def test_record_and_replay(server, tmp_path):
+    for i in range(3):
+        server.add_app('src', f'流程{i}')
+    path = str(tmp_path / 'cassette.json')
+
+    def run(transport):
+        source = migrate_flow.FlowMigrator(base_url=server.url, auth_url=server.url, transport=transport)
+        target = migrate_flow.FlowMigrator(base_url=server.url, auth_url=server.url, transport=transport)
+        assert source.login('src', 'password') and target.login('dst', 'password')
+        flows = source.get_cloud_flow_list()
+        return [target.migrate_from_cloud(flow, source) for flow in flows]
+
+    with RecordingTransport(path) as recorder:
+        assert run(recorder) == [True] * 3
+    text = open(path, encoding='utf-8').read()
+    assert all(token not in text for token in server.tokens)
+
+    replay = ReplayTransport(path, repeat=False)
+    requests_before = server.stats['requests']
+    assert run(replay) == [True] * 3
+    assert replay.remaining() == 0
+    assert server.stats['requests'] == requests_before
+
+    with pytest.raises(CassetteMiss):
+        replay.request('GET', f"{server.url}/not-recorded")
+
+
+def test_old_cassette_version_rejected(tmp_path):
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps({'version': 1, 'interactions': []}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        ReplayTransport(str(path))
+
+
+class _SlowTransport:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        return build_response(200, {}, b'{}', url)
+
+
+def test_single_flight_coalesces_identical_reads():
+    inner = _SlowTransport()
+    transport = SingleFlightTransport(inner)
+    headers = {'Authorization': 'bearer a'}
+    threads = [threading.Thread(target=transport.get, args=('http://api/detail',), kwargs={'headers': headers})
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while transport.stats()['coalesced'] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    inner.release.set()
+    for thread in threads:
+        thread.join()
+    assert inner.calls == 1
+
+    # 不同账号的请求不合并
+    transport.get('http://api/detail', headers={'Authorization': 'bearer b'})
+    assert inner.calls == 2
@@ -0,0 +1,42 @@
+# -*- coding:utf-8 -*-
+from migrate_flow import ProgressReader, TransferProgress
+
+
+def test_progress_reader_is_file_like():
+    seen = []
+    reader = ProgressReader(b'x' * 200000, lambda done, total: seen.append((done, total)), chunk_size=65536)
+    assert len(reader) == 200000
+    assert len(reader.read(1000)) == 1000
+    assert len(reader.read()) == 199000
+    assert reader.read() == b''
+    assert seen == [(1000, 200000), (200000, 200000)]
+
+    reader.seek(0)
+    assert [len(chunk) for chunk in reader] == [65536, 65536, 65536, 3392]
+
+
+def test_concurrent_transfers_do_not_reset_each_other():
+    progress = TransferProgress()
+    progress.begin([('f', '流程')])
+    progress('f', 'upload_json')
+    progress('f', 'upload_bot')
+    stages = []
+    for step in range(1, 5):
+        progress('f', 'upload_bot', step * 100, 400)
+        progress('f', 'upload_json', min(step * 10, 20), 20)
+        stages.append(progress.snapshot()['flows'][0]['stage'])
+    row = progress.snapshot()['flows'][0]
+    assert row['bytes'] == 420
+    assert stages == ['upload_bot'] * 4
+
+    progress('f', 'done')
+    snapshot = progress.snapshot()
+    assert (snapshot['finished'], snapshot['succeeded'], snapshot['transferred']) == (1, 1, 420)
+
+
+def test_retry_counts_resent_bytes():
+    progress = TransferProgress()
+    progress('f', 'upload_bot', 300, 400)
+    progress('f', 'upload_bot', 100, 400)
+    progress('f', 'upload_bot', 400, 400)
+    assert progress.snapshot()['flows'][0]['bytes'] == 700
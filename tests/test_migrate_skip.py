@@ -0,0 +1,58 @@
+# -*- coding:utf-8 -*-
+import os
+import json
+
+import pytest
+
+import migrate_flow
+from gen_shadowbot import generate_tree
+
+
+@pytest.fixture
+def local(tmp_path, monkeypatch):
+    """本地流程目录（LOCALAPPDATA 指向临时目录）和选中全部流程的清单"""
+    appdata = tmp_path / 'appdata'
+    flows = generate_tree(str(appdata / 'ShadowBot' / 'users'), users=1, apps=3, seed=1)
+    monkeypatch.setenv('LOCALAPPDATA', str(appdata))
+    manifest = tmp_path / 'all.json'
+    manifest.write_text(json.dumps(['*']), encoding='utf-8')
+    return flows, str(manifest)
+
+
+def test_migrate_skips_synced_flows(server, cli, local, monkeypatch):
+    flows, manifest = local
+    code, result = cli('migrate', 'local', '--manifest', manifest)
+    assert (code, result['succeeded'], len(server.apps['dst'])) == (0, 3, 3)
+
+    hashed = []
+    original = migrate_flow.robot_content_hash
+    monkeypatch.setattr(migrate_flow, 'robot_content_hash', lambda path: hashed.append(path) or original(path))
+    code, result = cli('migrate', 'local', '--manifest', manifest)
+    assert (result['succeeded'], len(result['skipped'])) == (0, 3)
+    # 文件状态未变化时不重新计算内容哈希
+    assert hashed == []
+
+    with open(os.path.join(flows[0]['robot_path'], 'main.py'), 'a', encoding='utf-8') as f:
+        f.write('\n# changed\n')
+    code, result = cli('migrate', 'local', '--manifest', manifest)
+    assert (result['succeeded'], len(result['skipped'])) == (1, 2)
+    assert hashed == [flows[0]['robot_path']]
+
+
+def test_migrate_again_when_target_deleted(server, cli, local):
+    _, manifest = local
+    cli('migrate', 'local', '--manifest', manifest)
+    victim = next(iter(server.apps['dst']))
+    del server.apps['dst'][victim]
+
+    code, result = cli('migrate', 'local', '--manifest', manifest, '--dry-run')
+    assert ([row['status'] for row in result['results']], len(result['skipped'])) == (['planned'], 2)
+    code, result = cli('migrate', 'local', '--manifest', manifest)
+    assert (result['succeeded'], len(server.apps['dst'])) == (1, 3)
+
+
+def test_dry_run_does_not_create_ledger(server, cli, local):
+    _, manifest = local
+    code, result = cli('migrate', 'local', '--manifest', manifest, '--dry-run')
+    assert (code, len(result['results']), result['skipped']) == (0, 3, [])
+    assert not os.path.exists(cli.ledger)
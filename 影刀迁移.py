@@ -6,8 +6,10 @@
 @time: 2024-12-28 13:29
 @desc:
 """
-import requests
 from requests_toolbelt.multipart.encoder import MultipartEncoder
+
+# HTTP 传输层：与 migrate_flow 相同，设置 YINGDAO_CASSETTE 时录制/回放（见 flow_transport.py）
+from flow_transport import transport
 # from dotenv import load_dotenv
 # import os
 # # 加载.env文件
@@ -38,7 +40,7 @@ class Appdata:
 			"grant_type": "password",
 			"scope": "all"
 		}
-		response = requests.post(url, headers=headers, params=params)
+		response = transport.post(url, headers=headers, params=params)
 		return response.json()['access_token']
 
 
@@ -64,11 +66,11 @@ class Appdata:
 			"checkAppRecycle": "True"
 		}
 
-		response = requests.get(url, headers=headers, params=params)
+		response = transport.get(url, headers=headers, params=params)
 		# print(response.json())
 		data = response.json()['data']
 		# 发起 GET 请求
-		response2 = requests.get(data['packageBotUrl'])
+		response2 = transport.get(data['packageBotUrl'])
 		return response2.content
 
 
@@ -95,7 +97,7 @@ class Appdata:
 			"isBot": True
 		}
 		# 发送 POST 请求
-		response = requests.post(url, headers=headers, json=data)
+		response = transport.post(url, headers=headers, json=data)
 		print(response.json())
 		return response.json()['data']['uploadUrl']
 
@@ -108,7 +110,7 @@ class Appdata:
 			"Content-Length": str(len(system_data))
 		}
 
-		response = requests.put(put_url, headers=headers, data=system_data)
+		response = transport.put(put_url, headers=headers, data=system_data)
 
 		print(response.status_code)
 		print(response.text)